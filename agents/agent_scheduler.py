@@ -0,0 +1,313 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+from tools.data_tools import feather, write_arrow_ipc, read_arrow_ipc
+
+BACKENDS = ("thread", "process", "inline", "async")
+
+# Below this many input rows a worker process costs more to start than it saves
+PROCESS_MIN_ROWS = 100_000
+
+# Run-wide settings from the CLI; sent to every worker process with its inputs
+CONFIG_KEYS = ("data_path", "chunksize", "use_cache", "low_memory", "profile_memory", "incremental")
+
+
+def _run_agent(agent_class, context: dict):
+    start = time.perf_counter()
+    try:
+        result = agent_class().run(context)
+    except Exception as e:
+        print(f"Error in {agent_class.__name__}: {str(e)}")
+        result = False
+    return bool(result), time.perf_counter() - start, None
+
+
+async def _arun_agent(agent_class, context: dict):
+    start = time.perf_counter()
+    try:
+        result = await agent_class().arun(context)
+    except Exception as e:
+        print(f"Error in {agent_class.__name__}: {str(e)}")
+        result = False
+    return bool(result), time.perf_counter() - start, None
+
+
+def _run_agent_in_process(agent_class, payload: dict, frame_paths: dict):
+    """
+    Worker-process entry point. DataFrames arrive as memory-mapped Arrow IPC
+    files (or pickled when pyarrow is unavailable); only the agent's declared
+    outputs are sent back to the parent context.
+    """
+    context = dict(payload)
+    for key, path in frame_paths.items():
+        context[key] = read_arrow_ipc(path)
+
+    ok, elapsed, _ = _run_agent(agent_class, context)
+    outputs = {key: context[key] for key in getattr(agent_class, "writes", ()) if key in context}
+    return ok, elapsed, outputs
+
+
+class AgentScheduler:
+    """
+    Runs pipeline agents as a dependency graph over the shared context.
+
+    Every agent class declares the context keys it needs and produces:
+
+        reads          = keys that must exist before the agent can start
+        optional_reads = keys it uses if present (it waits for their writers)
+        writes         = keys it adds to the context
+        critical       = if True, a failure aborts the rest of the pipeline
+        backend        = 'thread' (default), 'process', 'inline' or 'async'
+        warm_up(ctx)   = optional; called once every writer of the agent's
+                         required inputs has started, e.g. to start a worker
+                         pool that warms up while those writers run
+        shut_down(ran) = optional; called when the run ends, with whether
+                         the agent ran
+
+    An agent starts as soon as its inputs exist and no other agent that writes
+    one of its inputs is still pending or running. Agents whose required
+    inputs can no longer be produced are skipped. Wall-clock time is therefore
+    set by the critical path instead of the sum of hard-coded stages.
+
+    CPU-bound agents use the 'process' backend so they are not serialised by
+    the GIL. Their DataFrame inputs are written once to Arrow IPC files in
+    shared memory (/dev/shm where available) and memory-mapped by the workers.
+    Unless the backend is forced, small inputs (< PROCESS_MIN_ROWS rows) stay
+    on threads because spawning a worker would dominate their run time.
+
+    I/O-bound agents that provide an `arun` coroutine (the LLM agents) use the
+    'async' backend: they all share one event loop running in a background
+    thread, so their requests overlap and share the LLM client's concurrency
+    limit instead of each holding a worker thread while it waits.
+    """
+
+    def __init__(self, agent_classes: list, max_workers: int = 4, backend_override: str = None):
+        if backend_override is not None and backend_override not in BACKENDS:
+            raise ValueError(f"Unknown executor backend '{backend_override}'. Use one of {BACKENDS}.")
+        self.agent_classes = list(agent_classes)
+        self.max_workers = max_workers
+        self.backend_override = backend_override
+        self._ipc_dir = None
+        self._ipc_files = {}
+
+    # -----------------------------------------------------------
+    # Dependency checks
+    # -----------------------------------------------------------
+    def _writers(self, key: str, exclude) -> list:
+        return [cls for cls in self.agent_classes
+                if cls is not exclude and key in getattr(cls, "writes", ())]
+
+    def _inputs_settled(self, agent_class, finished: dict) -> bool:
+        """True once every other writer of the agent's inputs has finished."""
+        return all(
+            writer.__name__ in finished
+            for key in self._input_keys(agent_class)
+            for writer in self._writers(key, agent_class)
+        )
+
+    @staticmethod
+    def _input_keys(agent_class) -> tuple:
+        return tuple(getattr(agent_class, "reads", ())) + tuple(getattr(agent_class, "optional_reads", ()))
+
+    def _is_ready(self, agent_class, context: dict, finished: dict) -> bool:
+        return (all(key in context for key in getattr(agent_class, "reads", ()))
+                and self._inputs_settled(agent_class, finished))
+
+    def _missing_inputs(self, agent_class, context: dict, finished: dict) -> list:
+        """Required keys that are absent and that no unfinished agent can still write."""
+        return [
+            key for key in getattr(agent_class, "reads", ())
+            if key not in context
+            and all(w.__name__ in finished for w in self._writers(key, agent_class))
+        ]
+
+    # -----------------------------------------------------------
+    # Execution backends
+    # -----------------------------------------------------------
+    def _backend(self, agent_class, context: dict) -> str:
+        backend = self.backend_override or getattr(agent_class, "backend", "thread")
+        if backend == "async" and not hasattr(agent_class, "arun"):
+            # Only agents with an `arun` coroutine can share the event loop
+            return "thread"
+        if self.backend_override:
+            return backend
+        if backend == "process":
+            rows = max((len(context[key]) for key in self._input_keys(agent_class)
+                        if isinstance(context.get(key), pd.DataFrame)), default=0)
+            if rows < PROCESS_MIN_ROWS:
+                return "thread"
+        return backend
+
+    def _frame_path(self, key: str, df: pd.DataFrame) -> str:
+        """Arrow IPC file for a context DataFrame, written once per frame object."""
+        cache_key = (key, id(df))
+        if cache_key not in self._ipc_files:
+            if self._ipc_dir is None:
+                shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+                self._ipc_dir = tempfile.mkdtemp(prefix="agent_ipc_", dir=shm)
+            path = os.path.join(self._ipc_dir, f"{key}_{len(self._ipc_files)}.arrow")
+            self._ipc_files[cache_key] = (write_arrow_ipc(df, path), df)
+        return self._ipc_files[cache_key][0]
+
+    def _submit_process(self, executor, agent_class, context: dict) -> Future:
+        # Only the agent's declared inputs and the run settings are sent
+        payload, frame_paths = {}, {}
+        for key in self._input_keys(agent_class) + CONFIG_KEYS:
+            if key not in context:
+                continue
+            value = context[key]
+            if isinstance(value, pd.DataFrame) and feather is not None:
+                frame_paths[key] = self._frame_path(key, value)
+            else:
+                # Without pyarrow frames are pickled to the worker instead
+                payload[key] = value
+        return executor.submit(_run_agent_in_process, agent_class, payload, frame_paths)
+
+    def _submit(self, agent_class, context: dict, threads, processes, event_loop) -> Future:
+        backend = self._backend(agent_class, context)
+        if backend == "process":
+            return self._submit_process(processes(), agent_class, context)
+        if backend == "async":
+            return asyncio.run_coroutine_threadsafe(_arun_agent(agent_class, context), event_loop())
+        if backend == "inline":
+            future = Future()
+            future.set_result(_run_agent(agent_class, context))
+            return future
+        return threads.submit(_run_agent, agent_class, context)
+
+    def run(self, context: dict) -> dict:
+        """
+        Executes all agents and returns {agent name: status}, where status is
+        'success', 'failed' or 'skipped'. context['agent_timings'] receives
+        each agent's run time in seconds.
+        """
+        pending = list(self.agent_classes)
+        running = {}
+        finished = {}
+        timings = {}
+        aborted = False
+        pipeline_start = time.perf_counter()
+
+        # Agents that run in a worker process cannot use resources started here
+        hooked = [cls for cls in self.agent_classes
+                  if hasattr(cls, "warm_up")
+                  and (self.backend_override or getattr(cls, "backend", "thread")) != "process"]
+        warmed = []
+        started = set()
+
+        def warm_up_hooks():
+            # Not at pipeline start: a run that fails upstream pays nothing
+            for agent_class in hooked:
+                if agent_class in warmed or agent_class.__name__ in started or agent_class.__name__ in finished:
+                    continue
+                writers = [writer for key in getattr(agent_class, "reads", ())
+                           for writer in self._writers(key, agent_class)]
+                if all(writer.__name__ in started and finished.get(writer.__name__) != "failed"
+                       for writer in writers):
+                    warmed.append(agent_class)
+                    agent_class.warm_up(context)
+
+        process_pool = []
+
+        def processes():
+            # Spawned lazily: a run without process-backed agents pays nothing
+            if not process_pool:
+                process_pool.append(ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")))
+            return process_pool[0]
+
+        loop_thread = []
+
+        def event_loop():
+            # One loop shared by all async agents, also started lazily
+            if not loop_thread:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="agent-event-loop", daemon=True)
+                thread.start()
+                loop_thread.append((loop, thread))
+            return loop_thread[0][0]
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as threads:
+                while pending or running:
+                    # Launch (or skip) everything that has become decidable
+                    progressed = True
+                    while progressed and not aborted:
+                        progressed = False
+                        for agent_class in list(pending):
+                            name = agent_class.__name__
+                            if self._is_ready(agent_class, context, finished):
+                                print(f"\n=== ▶ {name} starting ({self._backend(agent_class, context)}) ===")
+                                future = self._submit(agent_class, context, threads, processes, event_loop)
+                                running[future] = agent_class
+                                started.add(name)
+                            else:
+                                missing = self._missing_inputs(agent_class, context, finished)
+                                if not missing:
+                                    continue
+                                print(f"Skipping {name}: missing inputs {missing}.")
+                                finished[name] = "skipped"
+                            pending.remove(agent_class)
+                            progressed = True
+                    if not aborted:
+                        warm_up_hooks()
+
+                    if aborted or not running:
+                        # Nothing left that can make progress
+                        for agent_class in pending:
+                            finished[agent_class.__name__] = "skipped"
+                        pending = []
+                        if not running:
+                            break
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        agent_class = running.pop(future)
+                        name = agent_class.__name__
+                        try:
+                            ok, elapsed, outputs = future.result()
+                        except Exception as e:
+                            # e.g. a worker process died or a value could not be pickled
+                            print(f"Error in {name}: {e}")
+                            ok, elapsed, outputs = False, 0.0, None
+                        if outputs:
+                            context.update(outputs)
+                        timings[name] = round(elapsed, 3)
+                        finished[name] = "success" if ok else "failed"
+
+                        if ok:
+                            print(f"{name} Finished ({elapsed:.2f}s).")
+                        elif getattr(agent_class, "critical", False):
+                            print(f"{name} failed. Aborting.")
+                            aborted = True
+                        else:
+                            print(f"Warning: {name} failed ({elapsed:.2f}s).")
+        finally:
+            for agent_class in warmed:
+                if hasattr(agent_class, "shut_down"):
+                    agent_class.shut_down(agent_class.__name__ in started)
+            if process_pool:
+                process_pool[0].shutdown()
+            if loop_thread:
+                loop, thread = loop_thread[0]
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+            if self._ipc_dir is not None:
+                shutil.rmtree(self._ipc_dir, ignore_errors=True)
+                self._ipc_dir = None
+                self._ipc_files = {}
+
+        context["agent_timings"] = timings
+        print(f"\n--- Scheduler: {len(timings)} agent(s) ran in "
+              f"{time.perf_counter() - pipeline_start:.2f}s wall-clock ---")
+        return finished
@@ -1,19 +1,63 @@
+import sys
+import tracemalloc
+
+try:
+    # Unix only; peak RSS is simply not reported elsewhere
+    import resource
+except ImportError:
+    resource = None
+
 import pandas as pd
-from tools.data_tools import clean_data
+from tools.data_tools import clean_data, clean_data_chunks
+from tools.incremental_tools import clean_incremental_update
 
 
 class DataCleanerAgent:
     """
     Takes the raw DataFrame from context, cleans it, and saves the cleaned DataFrame
     back into the context for use by parallel and ML agents.
+
+    In streaming mode (context['chunksize'] set, no raw DataFrame) the CSV is
+    cleaned chunk by chunk using the means from the streaming profile; the
+    cleaned rows are then held in memory as one DataFrame.
+
+    With context['low_memory'] set, raw_df is cleaned in place and released from
+    the context afterwards. context['cleaning_stats'] records how far cleaning
+    raised the process's peak resident memory (rss_peak_increase_mb, 0 when an
+    earlier step had already peaked higher) next to the process high-water mark
+    itself (process_peak_rss_mb); with context['profile_memory'] set
+    the memory allocated by the cleaning step itself is traced too (tracemalloc
+    slows every allocation and counts those of concurrently running agents).
+
+    In incremental mode (context['incremental_state'] set by the profiler)
+    only the new rows are cleaned and appended to the stored cleaned history;
+    context['new_rows_start'] is the position of the first new row.
     """
+    reads = ("profile_report",)
+    optional_reads = ("raw_df", "incremental_state")
+    writes = ("cleaned_df", "cleaning_stats", "new_rows_start")
+    critical = True
 
     def __init__(self):
         pass
 
+    @staticmethod
+    def _peak_rss_mb():
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 2)
+
     def run(self, context: dict) -> bool:
         print("🧹 [Cleaner] Cleaning data...")
 
+        if 'incremental_state' in context:
+            return self._run_incremental(context)
+
+        if 'raw_df' not in context and context.get('chunksize'):
+            return self._run_streaming(context)
+
         # Ensure raw data is available from the Profiler
         if 'raw_df' not in context:
             print(
@@ -22,14 +66,97 @@ class DataCleanerAgent:
 
         try:
             df_raw = context['raw_df']
-            df_clean = clean_data(df_raw)
+            low_memory = bool(context.get('low_memory'))
+            rows_before = len(df_raw)
+
+            rss_before = self._peak_rss_mb()
+            peak_bytes = None
+            if context.get('profile_memory'):
+                tracemalloc.start()
+                try:
+                    df_clean = clean_data(df_raw, inplace=low_memory)
+                    _, peak_bytes = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+            else:
+                df_clean = clean_data(df_raw, inplace=low_memory)
 
             # --- CRITICAL FIX: Save cleaned data to context for ML, Viz, and Insights agents ---
             context["cleaned_df"] = df_clean
 
+            if low_memory:
+                # Nothing downstream reads the raw frame once it has been cleaned
+                context.pop('raw_df', None)
+                del df_raw
+
+            context["cleaning_stats"] = {
+                "rows_before": rows_before,
+                "rows_after": len(df_clean),
+                "inplace": low_memory,
+            }
+            rss_after = self._peak_rss_mb()
+            if rss_after is not None:
+                context["cleaning_stats"]["process_peak_rss_mb"] = rss_after
+                context["cleaning_stats"]["rss_peak_increase_mb"] = round(rss_after - rss_before, 2)
+            if peak_bytes is not None:
+                context["cleaning_stats"]["peak_memory_mb"] = round(peak_bytes / 1024 ** 2, 2)
+                print(f"📉 [Cleaner] Peak memory allocated during cleaning: "
+                      f"{context['cleaning_stats']['peak_memory_mb']} MB")
+            if rss_after is not None:
+                print(f"📉 [Cleaner] Peak RSS raised by cleaning: "
+                      f"{context['cleaning_stats']['rss_peak_increase_mb']} MB "
+                      f"(process high-water mark {rss_after} MB)")
             print("✅ [Cleaner] Cleaning complete.")
             return True
 
         except Exception as e:
             print(f"Cleaner Error: An unexpected error occurred: {e}")
             return False
+
+    def _run_streaming(self, context: dict) -> bool:
+        profile = context.get('profile_report')
+        if not profile:
+            print("Cleaner Error: Streaming profile not found in context. Run Profiler first.")
+            return False
+
+        try:
+            fill_values = {
+                col: stats['mean']
+                for col, stats in profile['summary_stats'].items()
+                if 'mean' in stats and stats['count'] > 0
+            }
+            df_clean = clean_data_chunks(
+                context['data_path'], context['chunksize'], fill_values)
+            context["cleaned_df"] = df_clean
+
+            print(f"✅ [Cleaner] Cleaning complete (streamed, {len(df_clean)} rows kept).")
+            return True
+
+        except Exception as e:
+            print(f"Cleaner Error: An unexpected error occurred: {e}")
+            return False
+
+    def _run_incremental(self, context: dict) -> bool:
+        try:
+            df_new = context['raw_df']
+            df_clean, new_rows_start = clean_incremental_update(
+                df_new, context['incremental_state'], context['profile_report'])
+            context["cleaned_df"] = df_clean
+            context["new_rows_start"] = new_rows_start
+            # The update is committed; its merged stats need not travel to other agents
+            context.pop('incremental_state', None)
+
+            context["cleaning_stats"] = {
+                "rows_before": len(df_new),
+                "rows_after": len(df_clean) - new_rows_start,
+                "inplace": False,
+                "incremental": True,
+            }
+
+            print(f"✅ [Cleaner] Cleaning complete (incremental, {len(df_clean) - new_rows_start} "
+                  f"new rows kept, {len(df_clean)} total).")
+            return True
+
+        except Exception as e:
+            print(f"Cleaner Error: An unexpected error occurred: {e}")
+            return False
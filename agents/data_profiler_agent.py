@@ -1,11 +1,24 @@
 import pandas as pd
-from tools.data_tools import load_data, get_data_profile
+from tools.data_tools import load_data, get_data_profile, get_data_profile_streaming, dataset_fingerprint
+from tools.incremental_tools import begin_incremental_update
 
 class DataProfilerAgent:
     """
     Loads the raw data and generates a profile report.
     Crucially, it saves the raw DataFrame and profile to the context.
+
+    When context['chunksize'] is set the CSV is streamed instead: the profile is
+    built from mergeable per-chunk statistics and no raw DataFrame is kept.
+
+    When context['incremental'] is set only the rows appended since the last
+    incremental run are parsed: their statistics are merged into the stored
+    ones, raw_df holds just the new rows and the pending update is passed to
+    the cleaner in context['incremental_state'].
     """
+    reads = ("data_path",)
+    writes = ("raw_df", "profile_report", "columns", "dataset_fingerprint", "incremental_state")
+    critical = True
+
     def __init__(self):
         pass
 
@@ -17,7 +30,33 @@ class DataProfilerAgent:
                 print("Profiler Error: Invalid or missing 'data_path' in context.")
                 return False
 
-            df_raw = load_data(csv_path)
+            if context.get("incremental"):
+                df_new, profile, pending = begin_incremental_update(csv_path)
+                context["raw_df"] = df_new
+                context["incremental_state"] = pending
+                context["profile_report"] = profile
+                context["columns"] = profile["columns"]
+                context["dataset_fingerprint"] = dataset_fingerprint(profile)
+
+                print(f"📊 [Profiler] Dataset Shape: {profile['shape']} ({len(df_new)} new rows)")
+                print(f"📌 [Profiler] Columns: {profile['columns']}")
+                print("✅ [Profiler] Profiling complete.")
+                return True
+
+            chunksize = context.get("chunksize")
+            if chunksize:
+                # Streaming mode: only the (small) profile ends up in the context
+                profile = get_data_profile_streaming(csv_path, chunksize)
+                context["profile_report"] = profile
+                context["columns"] = profile["columns"]
+                context["dataset_fingerprint"] = dataset_fingerprint(profile)
+
+                print(f"📊 [Profiler] Dataset Shape: {profile['shape']} (streamed)")
+                print(f"📌 [Profiler] Columns: {profile['columns']}")
+                print("✅ [Profiler] Profiling complete.")
+                return True
+
+            df_raw = load_data(csv_path, use_cache=context.get("use_cache", True))
             
             # --- CRITICAL FIX: Save raw data to context for cleaning agent ---
             context["raw_df"] = df_raw
@@ -25,6 +64,10 @@ class DataProfilerAgent:
             profile = get_data_profile(df_raw)
             # Save profile report to context for Report Writer/LLMs
             context["profile_report"] = profile
+            # Column names for agents that only need the schema (e.g. External Context)
+            context["columns"] = profile["columns"]
+            # Schema fingerprint: selects this dataset's memory bank namespace
+            context["dataset_fingerprint"] = dataset_fingerprint(profile)
             
             print(f"📊 [Profiler] Dataset Shape: {df_raw.shape}")
             print(f"📌 [Profiler] Columns: {list(df_raw.columns)}")
@@ -36,4 +79,4 @@ class DataProfilerAgent:
             return False
         except Exception as e:
             print(f"Profiler Error: An unexpected error occurred: {e}")
-            return False
\ No newline at end of file
+            return False
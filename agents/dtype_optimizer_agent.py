@@ -0,0 +1,39 @@
+from tools.data_tools import optimize_dtypes
+
+
+class DtypeOptimizerAgent:
+    """
+    Runs between the Profiler and the Cleaner. Converts the raw DataFrame to
+    compact dtypes (categories, downcast numerics) so every later agent works
+    on a smaller frame, and records the memory saving in
+    context['memory_optimization'] (shown with the profile in the report).
+    """
+    reads = ("raw_df",)
+    writes = ("raw_df", "memory_optimization")
+
+    def __init__(self):
+        pass
+
+    def run(self, context: dict) -> bool:
+        print("🗜️ [DtypeOptimizer] Optimising column dtypes...")
+
+        if 'raw_df' not in context:
+            # Streaming mode keeps no raw frame in memory
+            print("DtypeOptimizer: No raw DataFrame in context, skipping.")
+            return True
+
+        try:
+            df, report = optimize_dtypes(context['raw_df'])
+            context['raw_df'] = df
+            context['memory_optimization'] = report
+
+            before_mb = report['memory_before_bytes'] / 1024 ** 2
+            after_mb = report['memory_after_bytes'] / 1024 ** 2
+            print(f"✅ [DtypeOptimizer] Memory: {before_mb:.2f} MB -> {after_mb:.2f} MB "
+                  f"({len(report['converted_columns'])} column(s) converted).")
+            return True
+
+        except Exception as e:
+            # Optimisation is an optimisation: the pipeline can continue without it
+            print(f"DtypeOptimizer Warning: Skipped due to an unexpected error: {e}")
+            return True
@@ -1,5 +1,6 @@
+import asyncio
 import json
-from agents.llm_client import generate_text
+from agents.llm_client import agenerate_text, is_error
 
 
 class ExternalContextAgent:
@@ -8,6 +9,10 @@ class ExternalContextAgent:
     external context (market trends, news) relevant to the data analysis.
     The LLM synthesizes the search results and provides citations.
     """
+    backend = "async"
+    reads = ("columns",)
+    optional_reads = ("column_roles",)
+    writes = ("external_context_report", "external_context_sources", "external_context_llm_cache_stats")
 
     def __init__(self):
         # System instructions to guide the LLM's role for external search
@@ -20,15 +25,17 @@ class ExternalContextAgent:
             "found by the search tool."
         )
 
-    def _prepare_prompt(self, data_columns: list) -> str:
+    def _prepare_prompt(self, data_columns: list, roles: dict = None) -> str:
         """Dynamically generates the prompt based on the dataset's columns."""
 
         # We look for keywords that suggest the industry (e.g., 'insurance', 'charges', 'hospital')
+        target = (roles or {}).get('target') or ''
 
         # In this example, the data is related to "insurance"
         if 'charges' in data_columns and 'smoker' in data_columns:
             industry_keyword = "health insurance and healthcare"
-        elif 'sales' in data_columns or 'revenue' in data_columns:
+        elif 'sales' in data_columns or 'revenue' in data_columns or \
+                any(hint in target.lower() for hint in ('sale', 'revenue')):
             industry_keyword = "global consumer market"
         else:
             industry_keyword = "general economic"
@@ -41,6 +48,9 @@ class ExternalContextAgent:
         return prompt
 
     def run(self, context: dict) -> bool:
+        return asyncio.run(self.arun(context))
+
+    async def arun(self, context: dict) -> bool:
         print(
             "--- [AGENT:External Context] Starting grounded search for external context ---")
 
@@ -51,19 +61,22 @@ class ExternalContextAgent:
         data_columns = context.get('columns', [])
 
         # 1. Prepare the LLM prompt
-        llm_prompt = self._prepare_prompt(data_columns)
+        llm_prompt = self._prepare_prompt(data_columns, context.get('column_roles'))
 
         # 2. Call LLM with Google Search tool enabled
         print("--- [TOOL:LLM] Calling Gemini with Google Search grounding ---")
 
         # The LLM Client will return a JSON string with {"text": ..., "sources": [...]}
-        response_json_string = generate_text(
+        cache_stats = context['external_context_llm_cache_stats'] = {}
+        response_json_string = await agenerate_text(
             prompt=llm_prompt,
             system_prompt=self.system_prompt,
-            tools=[{"google_search": {}}]  # Enable grounding tool
+            tools=[{"google_search": {}}],  # Enable grounding tool
+            use_cache=context.get('use_cache', True),
+            cache_stats=cache_stats
         )
 
-        if response_json_string.startswith("Error:"):
+        if is_error(response_json_string):
             print(
                 f"External Context Agent Error: LLM call failed: {response_json_string}")
             context['external_context_report'] = "External context search failed."
@@ -1,7 +1,9 @@
+import asyncio
+import hashlib
 import pandas as pd
 import json
-from agents.llm_client import generate_text
-from tools.memory_tools import read_memory_bank, write_insight_to_memory  # <-- NEW IMPORT
+from agents.llm_client import agenerate_text, is_error
+from tools.memory_tools import retrieve_relevant_insights, write_insight_to_memory
 
 
 class InternalInsightsAgent:
@@ -9,18 +11,25 @@ class InternalInsightsAgent:
     Analyzes the cleaned DataFrame to generate key internal insights.
     It now incorporates past insights from the memory bank to provide historical context.
     """
+    backend = "async"
+    reads = ("cleaned_df",)
+    optional_reads = ("dataset_fingerprint",)
+    writes = ("insights_report", "insights_llm_cache_stats")
 
     def __init__(self):
         # We want this agent to be the one that uses the memory bank for context
         pass
 
-    def _prepare_prompt(self, df_clean: pd.DataFrame, past_insights: list[dict]) -> str:
-        """Constructs the LLM prompt including data summary and past insights."""
-
-        # 1. Summarize the current dataset (top 5 rows and statistics)
+    @staticmethod
+    def _summarize_data(df_clean: pd.DataFrame) -> str:
+        """Summarizes the current dataset (top 5 rows and statistics)."""
         data_summary = f"Data Head:\n{df_clean.head().to_markdown(index=False)}\n\n"
         data_summary += f"Descriptive Statistics:\n{df_clean.describe().to_markdown()}\n\n"
         data_summary += f"Data Types:\n{df_clean.dtypes.to_markdown()}"
+        return data_summary
+
+    def _prepare_prompt(self, data_summary: str, past_insights: list[dict]) -> str:
+        """Constructs the LLM prompt including data summary and past insights."""
 
         # 2. Integrate past insights from memory
         memory_summary = "No past insights available."
@@ -65,6 +74,9 @@ class InternalInsightsAgent:
         return prompt
 
     def run(self, context: dict) -> bool:
+        return asyncio.run(self.arun(context))
+
+    async def arun(self, context: dict) -> bool:
         print("--- [AGENT:Internal Insights] Starting internal data analysis ---")
 
         if 'cleaned_df' not in context:
@@ -74,17 +86,30 @@ class InternalInsightsAgent:
 
         df_clean = context['cleaned_df']
 
-        # 1. Read past insights from memory
-        past_insights = read_memory_bank()
+        # 1. Retrieve the past insights most relevant to this dataset's schema
+        # and statistics, so the prompt stays the same size as memory grows.
+        # Only this dataset's memory namespace (its schema fingerprint) is
+        # searched. Findings about this exact data are not historical context,
+        # and leaving them out keeps the prompt (and its cached LLM response)
+        # stable across re-runs on an unchanged dataset.
+        # The summary and the memory bank (SQLite) block, so they run in a
+        # worker thread and leave the shared event loop to the other agents.
+        data_summary = await asyncio.to_thread(self._summarize_data, df_clean)
+        data_key = hashlib.sha256(data_summary.encode("utf-8")).hexdigest()[:16]
+        namespace = context.get("dataset_fingerprint")
+        past_insights = await asyncio.to_thread(
+            retrieve_relevant_insights, data_summary, exclude_data_key=data_key, namespace=namespace)
 
         # 2. Generate LLM prompt
-        prompt = self._prepare_prompt(df_clean, past_insights)
+        prompt = self._prepare_prompt(data_summary, past_insights)
 
         # 3. Call LLM
         print("--- [TOOL:LLM] Generating internal insights ---")
-        insights_content = generate_text(prompt)
+        cache_stats = context['insights_llm_cache_stats'] = {}
+        insights_content = await agenerate_text(
+            prompt, use_cache=context.get('use_cache', True), cache_stats=cache_stats)
 
-        if insights_content.startswith("Error:"):
+        if is_error(insights_content):
             print(
                 f"Internal Insights Agent Error: LLM call failed: {insights_content}")
             context['insights_report'] = "Internal insight generation failed."
@@ -105,9 +130,12 @@ class InternalInsightsAgent:
             # Clean up the bullet point marker
             key_insight = key_insight_match.lstrip('*- ').strip()
 
-            write_insight_to_memory(
+            await asyncio.to_thread(
+                write_insight_to_memory,
                 insight=key_insight,
-                source="InternalInsightsAgent"
+                source="InternalInsightsAgent",
+                data_key=data_key,
+                namespace=namespace
             )
         except Exception as e:
             print(
@@ -1,45 +1,350 @@
+import asyncio
+import hashlib
+import json
 import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
 
 # NOTE: This version relies on the 'config.py' file and the
 # google-generativeai SDK setup.
-from config import GEMINI_API_KEY, MODEL_NAME
-import google.generativeai as genai
-
-# Configure the model globally
-LLM_MODEL = None
-try:
-    if not GEMINI_API_KEY:
-        # In a real setup, this would fail, but for the Canvas environment,
-        # we configure to allow the system to inject the key later if possible.
-        # However, since this version requires the SDK setup, we keep the check.
-        raise ValueError("GEMINI_API_KEY is not set in config.py.")
-
-    # Using the google-genai library
-    genai.configure(api_key=GEMINI_API_KEY)
-    LLM_MODEL = genai.GenerativeModel(MODEL_NAME)
-    print("--- LLM Client configured successfully ---")
-except Exception as e:
-    print(f"Error configuring Generative AI: {e}")
-    LLM_MODEL = None
-
-
-def generate_text(prompt: str) -> str:
-    """Generates text using the configured Gemini model (The standard function)."""
-    if LLM_MODEL is None:
-        return "Error: Model not configured. Check GEMINI_API_KEY in config.py."
+from config import (
+    GEMINI_API_KEY,
+    MODEL_NAME,
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_CACHE_FILE,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+)
 
+# Every failure is returned as a string starting with ERROR_PREFIX; callers check with is_error()
+ERROR_PREFIX = "Error:"
+NOT_CONFIGURED_ERROR = f"{ERROR_PREFIX} Model not configured. Check GEMINI_API_KEY in config.py."
+
+# The SDK is imported and configured on first use, not at import time:
+# importing google.generativeai alone takes close to a second, and many runs
+# (--help, a failed profiling step, cache hits) never call the model.
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _configure_client():
     try:
-        response = LLM_MODEL.generate_content(prompt)
+        if not GEMINI_API_KEY:
+            # In a real setup, this would fail, but for the Canvas environment,
+            # we configure to allow the system to inject the key later if possible.
+            # However, since this version requires the SDK setup, we keep the check.
+            raise ValueError("GEMINI_API_KEY is not set in config.py.")
+
+        # Using the google-genai library
+        import google.generativeai as genai
+
+        genai.configure(api_key=GEMINI_API_KEY)
+        model = genai.GenerativeModel(MODEL_NAME)
+        print("--- LLM Client configured successfully ---")
+        return genai, model
+    except Exception as e:
+        print(f"Error configuring Generative AI: {e}")
+        return False
+
+
+def get_client():
+    """
+    Returns (genai module, default model), configuring the SDK on the first
+    call. Thread-safe; returns None if the client could not be configured.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = _configure_client()
+    return _CLIENT or None
+
+
+def _build_model(system_prompt: str = None):
+    """Returns a model for the given system prompt (the default model if none)."""
+    client = get_client()
+    if client is None:
+        return None
+    genai, model = client
+    if not system_prompt:
+        return model
+    return genai.GenerativeModel(MODEL_NAME, system_instruction=system_prompt)
+
+
+def _extract_sources(response) -> list:
+    """Collects web citations from a grounded response, if the SDK returned any."""
+    sources = []
+    for candidate in getattr(response, "candidates", None) or []:
+        metadata = getattr(candidate, "grounding_metadata", None)
+        for chunk in getattr(metadata, "grounding_chunks", None) or []:
+            web = getattr(chunk, "web", None)
+            if web is not None and getattr(web, "uri", None):
+                sources.append({"title": getattr(web, "title", ""), "uri": web.uri})
+    return sources
+
+
+def _format_response(response, tools) -> str:
+    # Tool-enabled calls return {"text": ..., "sources": [...]} as a JSON string
+    if not tools:
         return response.text
+    return json.dumps({"text": response.text, "sources": _extract_sources(response)})
+
+
+def request_key(prompt: str, system_prompt: str = None, tools: list = None) -> str:
+    """Stable identity of an LLM request: hash of (model, system prompt, prompt, tools)."""
+    payload = json.dumps([MODEL_NAME, system_prompt, prompt, tools], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ======================================================
+# Response cache
+# ======================================================
+class ResponseCache:
+    """
+    On-disk LLM response cache (SQLite), keyed by request_key(). Entries
+    expire after `ttl_seconds`; beyond `max_entries` the least recently
+    used responses are evicted. Only successful responses are stored.
+
+    Whether to use it is decided per call (the `use_cache` argument of
+    generate_text / agenerate_text, from context['use_cache']), so the
+    setting reaches agents running in worker processes.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._ready = True
+        return conn
+
+    def get(self, key: str):
+        """Returns the cached response for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            response = None
+            try:
+                if os.path.exists(self.path):
+                    with self._connect() as conn:
+                        row = conn.execute(
+                            "SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                        if row and now - row[1] <= self.ttl_seconds:
+                            response = row[0]
+                            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        elif row:
+                            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"LLM Cache Warning: Could not read {self.path}: {e}")
+            return response
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                        (key, response, now, now))
+                    conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,))
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"LLM Cache Warning: Could not write {self.path}: {e}")
+
+
+RESPONSE_CACHE = ResponseCache(LLM_CACHE_FILE, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES)
+
+# LLM agents record their cache lookups in context['<name>_llm_cache_stats'],
+# which comes back from worker processes like any other declared output.
+CACHE_STATS_SUFFIX = "_llm_cache_stats"
+
+
+def total_cache_stats(context: dict) -> dict:
+    """Sums the response cache hits and misses recorded by all LLM agents."""
+    totals = {"hits": 0, "misses": 0}
+    for key, stats in context.items():
+        if key.endswith(CACHE_STATS_SUFFIX):
+            for name in totals:
+                totals[name] += stats.get(name, 0)
+    return totals
+
+
+def is_error(text: str) -> bool:
+    """True if an LLM call returned no text or one of this module's error strings."""
+    return not text or text.startswith(ERROR_PREFIX)
+
+
+def _count_lookup(cache_stats: dict, cached) -> None:
+    if cache_stats is not None:
+        name = "misses" if cached is None else "hits"
+        cache_stats[name] = cache_stats.get(name, 0) + 1
+
+
+def generate_text(prompt: str, system_prompt: str = None, tools: list = None,
+                  use_cache: bool = True, cache_stats: dict = None) -> str:
+    """
+    Generates text using the configured Gemini model (The standard function).
+    With `use_cache` responses are served from and stored in RESPONSE_CACHE;
+    the lookup is counted in `cache_stats` ({"hits", "misses"}) if given.
+    """
+    key = request_key(prompt, system_prompt, tools)
+    if use_cache:
+        cached = RESPONSE_CACHE.get(key)
+        _count_lookup(cache_stats, cached)
+        if cached is not None:
+            print("--- [TOOL:LLM] Served from response cache ---")
+            return cached
+
+    model = _build_model(system_prompt)
+    if model is None:
+        return NOT_CONFIGURED_ERROR
+
+    try:
+        kwargs = {"tools": tools} if tools else {}
+        response = model.generate_content(prompt, **kwargs)
+        text = _format_response(response, tools)
     except Exception as e:
-        return f"Error during text generation: {e}"
+        return f"{ERROR_PREFIX} Text generation failed: {e}"
+
+    if use_cache and not is_error(text):
+        RESPONSE_CACHE.put(key, text)
+    return text
+
+
+# ======================================================
+# Async client
+# ======================================================
+# Semaphore, in-flight requests and models are bound to the event loop they
+# were created on, so they are kept per loop.
+_LOOP_STATE = weakref.WeakKeyDictionary()
+
+
+def _loop_state() -> dict:
+    loop = asyncio.get_running_loop()
+    state = _LOOP_STATE.get(loop)
+    if state is None:
+        state = {
+            "semaphore": asyncio.Semaphore(LLM_MAX_CONCURRENCY),
+            "inflight": {},
+            "models": {},
+        }
+        _LOOP_STATE[loop] = state
+    return state
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate-limit (HTTP 429 / quota) errors are worth retrying; others are not."""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "quota" in message
+
+
+async def _agenerate_uncoalesced(key: str, prompt: str, system_prompt: str, tools: list, timeout: float,
+                                 use_cache: bool) -> str:
+    state = _loop_state()
+    # First use imports the SDK; keep that off the event loop
+    client = _CLIENT or await asyncio.to_thread(get_client)
+    if not client:
+        return NOT_CONFIGURED_ERROR
+    genai = client[0]
+
+    # Async gRPC channels belong to one loop, so models are cached per loop
+    model = state["models"].get(system_prompt)
+    if model is None:
+        model = genai.GenerativeModel(MODEL_NAME, system_instruction=system_prompt or None)
+        state["models"][system_prompt] = model
+
+    kwargs = {"tools": tools} if tools else {}
+    delay = LLM_RETRY_BASE_DELAY
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with state["semaphore"]:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, **kwargs), timeout)
+            text = _format_response(response, tools)
+            if use_cache and not is_error(text):
+                # SQLite I/O: keep it off the shared event loop
+                await asyncio.to_thread(RESPONSE_CACHE.put, key, text)
+            return text
+        except asyncio.TimeoutError:
+            error = f"timed out after {timeout}s"
+        except Exception as e:
+            if not _is_retryable(e):
+                return f"{ERROR_PREFIX} Text generation failed: {e}"
+            error = str(e)
+
+        if attempt == LLM_MAX_RETRIES:
+            return f"{ERROR_PREFIX} Text generation failed: {error} (after {attempt + 1} attempts)"
+        # Exponential backoff with jitter so concurrent callers do not retry in lockstep
+        await asyncio.sleep(delay * (1 + random.random() * 0.25))
+        delay *= 2
+
+
+async def agenerate_text(prompt: str, system_prompt: str = None, tools: list = None,
+                         timeout: float = LLM_TIMEOUT_SECONDS, use_cache: bool = True,
+                         cache_stats: dict = None) -> str:
+    """
+    Async counterpart of generate_text. At most LLM_MAX_CONCURRENCY requests
+    are in flight per event loop, rate-limit errors and timeouts are retried
+    with exponential backoff, and identical concurrent requests are
+    coalesced into a single API call whose result every caller receives.
+    With `use_cache` responses are served from RESPONSE_CACHE when possible
+    (lookups counted in `cache_stats`, as in generate_text).
+    """
+    state = _loop_state()
+    key = request_key(prompt, system_prompt, tools)
+
+    if use_cache:
+        cached = await asyncio.to_thread(RESPONSE_CACHE.get, key)
+        _count_lookup(cache_stats, cached)
+        if cached is not None:
+            print("--- [TOOL:LLM] Served from response cache ---")
+            return cached
+
+    task = state["inflight"].get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _agenerate_uncoalesced(key, prompt, system_prompt, tools, timeout, use_cache))
+        state["inflight"][key] = task
+        task.add_done_callback(lambda _: state["inflight"].pop(key, None))
+
+    # Shielded so one caller being cancelled does not cancel the shared request
+    return await asyncio.shield(task)
 
 # --- Compatibility Function for Agents ---
 
 
-def generate_report_content(prompt: str) -> str:
+def generate_report_content(prompt: str, use_cache: bool = True, cache_stats: dict = None) -> str:
     """
-    Compatibility layer for the Report Writer Agent, calling the 
+    Compatibility layer for the Report Writer Agent, calling the
     user-defined 'generate_text' function.
     """
-    return generate_text(prompt)
+    return generate_text(prompt, use_cache=use_cache, cache_stats=cache_stats)
+
+
+async def agenerate_report_content(prompt: str, use_cache: bool = True, cache_stats: dict = None) -> str:
+    """Async compatibility layer for the Report Writer Agent."""
+    return await agenerate_text(prompt, use_cache=use_cache, cache_stats=cache_stats)
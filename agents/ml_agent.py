@@ -3,6 +3,7 @@ import pandas as pd
 from tools.ml_tools import (
     prepare_time_series_data,
     predict_sales_forecast,
+    forecast_by_group,
     detect_anomalies,
     predict_demand_by_category
 )
@@ -16,10 +17,19 @@ class MLAgent:
     It relies on context['cleaned_df'] and stores its outputs in
     context['ml_reports'] for the Recommendation Agent.
     """
+    reads = ("cleaned_df",)
+    optional_reads = ("dataset_fingerprint", "new_rows_start", "column_roles")
+    writes = ("ml_reports",)
+    # Model fitting holds the GIL for seconds on large data: give it its own process
+    backend = "process"
 
     def __init__(self):
         pass
 
+    @staticmethod
+    def _report_progress(done: int, total: int):
+        print(f"--- [TOOL:ML] Forecast progress: {done}/{total} series ---")
+
     def run(self, context: dict) -> bool:
         print("\n--- [AGENT:ML] Starting Machine Learning Analysis ---")
 
@@ -28,13 +38,18 @@ class MLAgent:
             return False
 
         df_clean = context["cleaned_df"]
+        # Shared column roles; each tool falls back to its own detection without them
+        roles = context.get("column_roles")
         ml_reports = {}
 
         # -----------------------------------------
         # 1. Prepare Time Series Data
         # -----------------------------------------
         print("--- [TOOL:ML] Preparing time series data...")
-        df_ts = prepare_time_series_data(df_clean)
+        # Incremental runs only aggregate the rows appended since the last run
+        df_ts = prepare_time_series_data(
+            df_clean, fingerprint=context.get("dataset_fingerprint"),
+            new_rows_start=context.get("new_rows_start"), roles=roles)
 
         if df_ts is None or df_ts.empty:
             print("ML Agent Warning: Could not prepare time-series data.")
@@ -53,12 +68,34 @@ class MLAgent:
 
         ml_reports["sales_forecast_path"] = forecast_path
 
+        # -----------------------------------------
+        # 2b. Per-Category / Per-Region Forecasts
+        # -----------------------------------------
+        if df_ts is not None and not df_ts.empty:
+            if roles is not None:
+                group_cols = [col for col in (roles.get("product"), roles.get("region"))
+                              if col in df_clean.columns]
+            else:
+                group_cols = [col for col in df_clean.columns if col.lower() in ("category", "region")]
+            for group_col in group_cols:
+                print(f"--- [TOOL:ML] Running sales forecast by {group_col}...")
+                try:
+                    group_forecast_path = forecast_by_group(
+                        df_clean, group_col, steps=14, progress_callback=self._report_progress, roles=roles)
+                except Exception as e:
+                    print(f"Forecasting by {group_col} failed: {e}")
+                    group_forecast_path = None
+
+                ml_reports[f"{group_col.lower()}_forecast_path"] = group_forecast_path
+
         # -----------------------------------------
         # 3. Anomaly Detection
         # -----------------------------------------
         print("--- [TOOL:ML] Running anomaly detection...")
         try:
-            anomalies_path = detect_anomalies(df_clean)
+            # Fitted models are persisted per dataset and reused for appended rows
+            anomalies_path = detect_anomalies(
+                df_clean, fingerprint=context.get("dataset_fingerprint"), roles=roles)
         except Exception as e:
             print(f"Anomaly detection failed: {e}")
             anomalies_path = None
@@ -71,7 +108,8 @@ class MLAgent:
         print("--- [TOOL:ML] Predicting demand by category...")
         try:
             demand_path = predict_demand_by_category(
-                df_clean, category_col="Category")
+                df_clean, category_col=(roles or {}).get("product") or "Category",
+                quantity_col=roles.get("quantity") if roles else None)
         except Exception as e:
             print(f"Demand prediction failed: {e}")
             demand_path = None
@@ -5,6 +5,8 @@ class RecommendationAgent:
     The Recommendation Agent reads the ML results and creates
     the final business recommendations.
     """
+    reads = ("ml_reports",)
+    writes = ("recommendation_report",)
 
     def __init__(self):
         pass
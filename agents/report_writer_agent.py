@@ -1,16 +1,37 @@
-import json
+import asyncio
+import math
 import os
 import numpy as np
 import pandas as pd
 
-from agents.llm_client import generate_report_content
+from agents.llm_client import agenerate_report_content, is_error
+from config import REPORT_PROMPT_TOKEN_BUDGET
+from tools.prompt_tools import (
+    MAX_ITEMS,
+    PROFILE_COLUMN_STEPS,
+    TABLE_ROWS,
+    build_prompt,
+    summarize_profile,
+)
 
 
 class ReportWriterAgent:
     """
     The final agent. It gathers all data, reports, plots, and recommendations
     from the context and synthesizes the final analysis report using the LLM.
+
+    The prompt is assembled by build_prompt within REPORT_PROMPT_TOKEN_BUDGET:
+    sections are added in order of importance and the data profile is
+    summarised (fewer per-column stats) or truncated to fit. The estimated
+    tokens per section are stored in context['report_prompt_stats'].
     """
+    backend = "async"
+    optional_reads = (
+        "profile_report", "insights_report", "external_context_report",
+        "ml_reports", "recommendation_report", "plot_paths", "column_roles",
+        "memory_optimization",
+    )
+    writes = ("final_report_status", "final_report_content", "report_prompt_stats", "report_llm_cache_stats")
 
     def __init__(self):
         pass
@@ -18,32 +39,55 @@ class ReportWriterAgent:
     # -----------------------------------------------------------
     # 🔧 UTIL: Convert numpy values to JSON-safe native Python
     # -----------------------------------------------------------
-    def _convert_numpy_types(self, obj):
+    def _convert_numpy_types(self, obj, _memo: dict = None):
+        """
+        JSON-safe copy of obj with native Python types. Tables are cut to
+        TABLE_ROWS rows (rendered as Markdown) and arrays to MAX_ITEMS
+        before anything is converted, so the cost depends on the size of the
+        output rather than of the data. A subtree reachable more than once
+        is converted once.
+        """
+        if _memo is None:
+            _memo = {}
+        if id(obj) in _memo:
+            return _memo[id(obj)]
+
         if isinstance(obj, (np.integer, np.int64)):
             return int(obj)
 
-        elif isinstance(obj, (np.floating, np.float64)):
-            if np.isnan(obj):
+        elif isinstance(obj, (float, np.floating)):
+            if math.isnan(obj):
                 return None
             return float(obj)
 
+        elif isinstance(obj, np.bool_):
+            return bool(obj)
+
         elif isinstance(obj, dict):
-            return {k: self._convert_numpy_types(v) for k, v in obj.items()}
+            result = {k: self._convert_numpy_types(v, _memo) for k, v in obj.items()}
 
-        elif isinstance(obj, list):
-            return [self._convert_numpy_types(v) for v in obj]
+        elif isinstance(obj, (list, tuple)):
+            result = [self._convert_numpy_types(v, _memo) for v in obj]
+
+        elif isinstance(obj, (np.ndarray, pd.Series)):
+            # tolist() converts the whole (truncated) array to Python scalars at once
+            result = [None if isinstance(v, float) and math.isnan(v) else v
+                      for v in obj[:MAX_ITEMS].tolist()]
 
         elif isinstance(obj, pd.DataFrame):
-            # Convert each cell to Python type
-            safe_df = obj.applymap(self._convert_numpy_types)
-            return safe_df.head(10).to_markdown(index=False)
+            head = obj.head(TABLE_ROWS)
+            result = head.astype(object).where(head.notna(), None).to_markdown(index=False)
+
+        else:
+            return obj
 
-        return obj
+        _memo[id(obj)] = result
+        return result
 
     # -----------------------------------------------------------
     # 🔧 BUILD LLM PROMPT
     # -----------------------------------------------------------
-    def _prepare_final_prompt(self, context: dict) -> str:
+    def _prepare_final_prompt(self, context: dict) -> tuple[str, dict]:
 
         # Build safe plot list
         plots_dir = "reports/plots"
@@ -52,13 +96,18 @@ class ReportWriterAgent:
             plot_files = [f for f in os.listdir(
                 plots_dir) if f.endswith(".png")]
 
+        profile = context.get("profile_report", "N/A")
+        if isinstance(profile, dict) and "memory_optimization" in context:
+            # A copy: the profile is shared with agents that may still be running
+            profile = {**profile, "memory_optimization": context["memory_optimization"]}
+
         # Base report data
         report_data = {
-            "Data_Profile": self._convert_numpy_types(context.get("profile_report", "N/A")),
+            "Data_Profile": profile,
             "Internal_Insights": context.get("insights_report", "N/A"),
-            "External_Context": context.get("external_context", "N/A"),
+            "External_Context": context.get("external_context_report", "N/A"),
             "Recommendation_Report": context.get("recommendation_report", "N/A"),
-            "ML_Reports_Summary": self._convert_numpy_types(context.get("ml_reports", {})),
+            "ML_Reports_Summary": context.get("ml_reports", {}),
             "Plot_Files": plot_files,
         }
 
@@ -73,31 +122,44 @@ class ReportWriterAgent:
                 # Case 1: Value is a CSV file path
                 if isinstance(item, str) and item.endswith(".csv") and os.path.exists(item):
                     try:
-                        df = pd.read_csv(item)
-                        # Ensure conversion to native types before to_markdown
-                        ml_summary[key] = self._convert_numpy_types(
-                            df).head(10).to_markdown(index=False)
+                        # Only the rows that are shown are read
+                        ml_summary[key] = pd.read_csv(item, nrows=TABLE_ROWS)
                     except Exception as e:
                         ml_summary[key] = f"Error loading CSV: {e}"
 
                 # Case 2: Value is a dict (model metrics or JSON)
-                elif isinstance(item, dict):
-                    ml_summary[key] = self._convert_numpy_types(item)
-
                 # Case 3: Value is a string or list that needs type safety
-                elif isinstance(item, (str, list)):
-                    ml_summary[key] = self._convert_numpy_types(item)
+                elif isinstance(item, (dict, str, list)):
+                    ml_summary[key] = item
 
             report_data["ML_Data_Summaries"] = ml_summary
 
+        # One conversion pass over everything; the encoder catches any leftovers
+        data = self._convert_numpy_types(report_data)
+
         # ----------------------------------------
         # Construct Prompt
         # ----------------------------------------
-        # Use simple conversion to ensure no numpy types linger in the prompt JSON
-        report_data_safe = self._convert_numpy_types(report_data)
-        readable_json = json.dumps(report_data_safe, indent=2)
-
-        prompt = (
+        roles = context.get("column_roles") or {}
+        priority_columns = list(dict.fromkeys(
+            roles[key] for key in ("target", "date", "quantity", "product", "category") if roles.get(key)))
+        profile_summarizers = [
+            lambda profile, n=n: summarize_profile(profile, n, priority_columns)
+            for n in PROFILE_COLUMN_STEPS
+        ]
+
+        # (name, content, max share of the budget, summarizers), most important first
+        sections = [
+            ("Recommendation_Report", data["Recommendation_Report"], 0.25, None),
+            ("Internal_Insights", data["Internal_Insights"], 0.25, None),
+            ("ML_Data_Summaries", data.get("ML_Data_Summaries", {}), 0.25, None),
+            ("Data_Profile", data["Data_Profile"], 0.3, profile_summarizers),
+            ("External_Context", data["External_Context"], 0.2, None),
+            ("ML_Reports_Summary", data["ML_Reports_Summary"], 0.05, None),
+            ("Plot_Files", data["Plot_Files"], 0.05, None),
+        ]
+
+        header = (
             "You are a Senior Business Analyst. Based on the following structured data, "
             "write a clear, professional, 500-700 word Markdown report.\n\n"
             "The report MUST include:\n"
@@ -107,46 +169,57 @@ class ReportWriterAgent:
             "4. **Machine Learning Analysis Summary**\n"
             "5. **Strategic Recommendations**\n\n"
             "Do NOT include the raw JSON. Use it only as reference.\n"
-            "Below is the structured data:\n\n"
-            "------------------------------\n"
-            f"{readable_json}\n"
+            "Below is the structured data (compact JSON or text per section):\n\n"
             "------------------------------\n"
         )
+        footer = "------------------------------\n"
+
+        return build_prompt(header, sections, REPORT_PROMPT_TOKEN_BUDGET, footer)
 
-        return prompt
+    @staticmethod
+    def _write_report(text: str):
+        with open("reports/final_analysis_report.md", "w", encoding="utf-8") as f:
+            f.write(text)
 
     # -----------------------------------------------------------
     # 🔧 RUN AGENT (UPDATED to return context)
     # -----------------------------------------------------------
-    def run(self, context: dict) -> dict:  # Updated return type to dict
+    def run(self, context: dict) -> dict:
+        return asyncio.run(self.arun(context))
+
+    async def arun(self, context: dict) -> dict:  # Updated return type to dict
         print("📝 [Report] Writing report...")
 
         os.makedirs("reports", exist_ok=True)
 
-        final_prompt = self._prepare_final_prompt(context)
+        # Reading the ML outputs and converting the data blocks; off the shared event loop
+        final_prompt, prompt_stats = await asyncio.to_thread(self._prepare_final_prompt, context)
+        context["report_prompt_stats"] = prompt_stats
+        for name, section in prompt_stats.items():
+            print(f"--- [TOOL:Report] {name}: ~{section['tokens']} tokens "
+                  f"(of {section['original_tokens']}, {section['status']}) ---")
 
         print("--- [TOOL:LLM] Calling Gemini to synthesize final report... ---")
-        final_report = generate_report_content(final_prompt)
+        cache_stats = context["report_llm_cache_stats"] = {}
+        final_report = await agenerate_report_content(
+            final_prompt, use_cache=context.get("use_cache", True), cache_stats=cache_stats)
 
         # LLM failed
-        if not final_report or final_report.startswith("Error:"):
+        if is_error(final_report):
             print("❌ [Report] LLM failed, saving fallback file.")
 
             context["final_report_status"] = "FAILURE (LLM Error)"
             context["final_report_content"] = "Report generation failed due to an LLM error."
 
-            with open("reports/final_analysis_report.md", "w", encoding="utf-8") as f:
-                f.write("# REPORT GENERATION FAILED\n\n")
-                f.write("LLM error. Raw prompt was:\n\n")
-                f.write(final_prompt)
+            await asyncio.to_thread(
+                self._write_report, "# REPORT GENERATION FAILED\n\nLLM error. Raw prompt was:\n\n" + final_prompt)
 
             # Critical: Always return the context, even if failed.
             return context
 
         # Write final report
         try:
-            with open("reports/final_analysis_report.md", "w", encoding="utf-8") as f:
-                f.write(final_report)
+            await asyncio.to_thread(self._write_report, final_report)
 
             # Critical: Update context with the successful output
             context["final_report_status"] = "SUCCESS"
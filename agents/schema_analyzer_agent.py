@@ -0,0 +1,35 @@
+from tools.data_tools import analyze_schema
+
+
+class SchemaAnalyzerAgent:
+    """
+    Derives column roles (date, target, quantity, category, ids) and
+    cardinalities from the profile once and stores them in
+    context['column_roles'] for the ML, visualization and LLM agents.
+    """
+    reads = ("profile_report",)
+    writes = ("column_roles",)
+
+    def __init__(self):
+        pass
+
+    def run(self, context: dict) -> bool:
+        print("🧭 [Schema] Analysing column roles...")
+
+        if 'profile_report' not in context:
+            print("Schema Analyzer Error: Profile report not found in context. Run Profiler first.")
+            return False
+
+        try:
+            roles = analyze_schema(context['profile_report'])
+            context['column_roles'] = roles
+
+            print(f"📌 [Schema] date={roles['date']}, target={roles['target']}, "
+                  f"quantity={roles['quantity']}, category={roles['category']}, "
+                  f"product={roles['product']}, region={roles['region']}, ids={roles['ids']}")
+            print("✅ [Schema] Column roles ready.")
+            return True
+
+        except Exception as e:
+            print(f"Schema Analyzer Error: An unexpected error occurred: {e}")
+            return False
@@ -1,22 +1,46 @@
-import os
 from tools.visualization_tools import (
     find_best_columns,
-    create_time_series_plot,
-    create_categorical_comparison_plot,
-    create_correlation_heatmap
+    time_series_job,
+    categorical_comparison_job,
+    correlation_heatmap_job,
+    render_plots,
+    prune_plot_cache,
+    PLOT_POOL_MIN_ROWS,
+    start_plot_pool,
+    shutdown_plot_pool
 )
 
 class VisualizationAgent:
     """
     The Visualization Agent generates and saves key diagnostic and summary plots.
     It now uses a column-agnostic approach based on data type and count.
+
+    Plot data is prepared here and the independent figures are rendered in
+    parallel by render_plots; per-plot render times go to context['plot_timings'].
+    For large datasets the scheduler starts the render pool (warm_up) once
+    cleaning has started, so worker startup overlaps with cleaning.
+
+    Plots whose input columns and parameters are unchanged are reused from
+    reports/plots (unless context['use_cache'] is False). After a run, cached
+    plots that this run no longer produced are removed.
     """
-    def __init__(self):
-        # Clear old plots before starting
-        if os.path.exists("reports/plots"):
-            for f in os.listdir("reports/plots"):
-                os.remove(os.path.join("reports/plots", f))
-        
+    reads = ("cleaned_df",)
+    optional_reads = ("column_roles",)
+    writes = ("plot_paths", "plot_timings")
+    # Figures render in the shared plot pool; the data reduction here is NumPy
+    backend = "thread"
+
+    @staticmethod
+    def warm_up(context: dict):
+        profile = context.get('profile_report') or {}
+        if profile.get('shape', (0,))[0] >= PLOT_POOL_MIN_ROWS:
+            start_plot_pool()
+
+    @staticmethod
+    def shut_down(ran: bool):
+        # If the agent never ran, do not wait for workers that are still warming up
+        shutdown_plot_pool(wait=ran)
+
     def run(self, context: dict) -> bool:
         print("🎨 [Viz] Starting Visualization Agent...")
         
@@ -27,26 +51,38 @@ class VisualizationAgent:
         df_clean = context['cleaned_df']
         
         # 1. Dynamically find the best columns
-        target_col, group_col = find_best_columns(df_clean)
+        roles = context.get('column_roles')
+        target_col, group_col = find_best_columns(df_clean, roles)
         
         if not target_col:
             print("Visualization Agent Warning: Could not find a suitable numeric column to plot.")
             context['plot_paths'] = {"status": "Failed due to missing numeric data."}
             return False
 
-        plot_paths = {}
+        use_cache = context.get('use_cache', True)
+        jobs = {}
 
-        # 2. Time Series Plot (will skip for insurance.csv, but remains for flexibility)
-        plot_paths['time_series'] = create_time_series_plot(df_clean, target_col)
+        # 2. Time Series Plot (skipped for cross-sectional data such as insurance.csv)
+        jobs['time_series'] = time_series_job(
+            df_clean, target_col, roles.get('date') if roles else None, use_cache=use_cache)
         
         # 3. Categorical Comparison Plot (e.g., Average charges by region)
         if group_col:
-            plot_paths['categorical_comparison'] = create_categorical_comparison_plot(df_clean, target_col, group_col)
+            jobs['categorical_comparison'] = categorical_comparison_job(
+                df_clean, target_col, group_col, use_cache=use_cache)
         else:
-            plot_paths['categorical_comparison'] = "N/A: No suitable categorical column found."
+            jobs['categorical_comparison'] = "N/A: No suitable categorical column found."
 
         # 4. Correlation Heatmap
-        plot_paths['correlation_heatmap'] = create_correlation_heatmap(df_clean)
+        jobs['correlation_heatmap'] = correlation_heatmap_job(df_clean, use_cache=use_cache)
+
+        # 5. Render all figures at once
+        plot_paths, plot_timings = render_plots(jobs)
+        context['plot_timings'] = plot_timings
+
+        # Reference-tracked cleanup: drop only cached plots this run did not produce
+        for path in prune_plot_cache(plot_paths.values()):
+            print(f"--- [TOOL:Viz] Removed stale plot {path} ---")
         
         context['plot_paths'] = plot_paths
         
@@ -8,6 +8,18 @@ MODEL_NAME = 'gemini-2.5-flash'
 # --- File Paths ---
 DATA_FILE = 'data/sales_data.csv'
 REPORT_DIR = 'reports'
-MEMORY_FILE = os.path.join(REPORT_DIR, 'memory_bank.json')
+MEMORY_FILE = os.path.join(REPORT_DIR, 'memory_bank.sqlite')
 FINAL_REPORT_FILE = os.path.join(REPORT_DIR, 'final_analysis_report.md')
-PLOTS_DIR = os.path.join(REPORT_DIR, 'plots')
\ No newline at end of file
+PLOTS_DIR = os.path.join(REPORT_DIR, 'plots')
+
+# --- LLM Client ---
+LLM_MAX_CONCURRENCY = 4        # Max simultaneous in-flight LLM requests per event loop
+LLM_TIMEOUT_SECONDS = 120      # Per-call timeout for async LLM requests
+LLM_MAX_RETRIES = 3            # Retries on rate-limit / timeout errors
+LLM_RETRY_BASE_DELAY = 1.0     # Seconds; doubled after every retry
+LLM_CACHE_FILE = os.path.join(REPORT_DIR, 'cache', 'llm_cache.sqlite')
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600  # Cached responses older than this are re-requested
+LLM_CACHE_MAX_ENTRIES = 500    # Least recently used responses are evicted beyond this
+
+# --- Report Prompt ---
+REPORT_PROMPT_TOKEN_BUDGET = 8000  # Upper bound on the final report prompt (estimated tokens)
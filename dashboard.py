@@ -5,6 +5,17 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import time
 
+from tools.visualization_tools import (
+    histogram_data,
+    draw_histogram,
+    box_stats,
+    grouped_box_stats,
+    draw_boxes,
+    violin_stats,
+    draw_scatter,
+    correlation_matrix,
+)
+
 # Set Streamlit Page Configuration
 st.set_page_config(layout="wide", page_title="Generic AI Data Profiler", initial_sidebar_state="expanded")
 
@@ -28,21 +39,26 @@ def generate_generic_plots(df):
         data = df[col].dropna()
         if len(data) > 0 and data.nunique() > 10:
             
+            # Plots are drawn from binned counts and quantiles, not from every row
             # --- Histogram (Distribution) ---
             fig_hist, ax_hist = plt.subplots(figsize=(8, 4))
-            sns.histplot(data, bins=30, kde=True, ax=ax_hist, color=PALETTE_PRIMARY)
+            draw_histogram(ax_hist, *histogram_data(data, bins=30), color=PALETTE_PRIMARY)
             ax_hist.set_title(f'Distribution of {col.title()}', fontsize=12)
             plots[f'Dist_{col}'] = fig_hist
             
             # --- Box Plot (Outliers) ---
             fig_box, ax_box = plt.subplots(figsize=(8, 2))
-            sns.boxplot(x=data, ax=ax_box, color=PALETTE_SECONDARY)
+            draw_boxes(ax_box, [box_stats(data)], orientation='horizontal', colors=[PALETTE_SECONDARY])
             ax_box.set_title(f'Box Plot of {col.title()} (Outliers)', fontsize=12)
             plots[f'Box_{col}'] = fig_box
             
             # --- Violin Plot (Density & Distribution) ---
             fig_violin, ax_violin = plt.subplots(figsize=(8, 4))
-            sns.violinplot(x=data, y=[col] * len(data), ax=ax_violin, color='#fdae61', orient='h') # Orange/Peach
+            violin = ax_violin.violin([violin_stats(data)], orientation='horizontal', showmedians=True)
+            for body in violin['bodies']:
+                body.set_facecolor('#fdae61') # Orange/Peach
+                body.set_alpha(0.8)
+            ax_violin.set_yticks([1], [col])
             ax_violin.set_title(f'Violin Plot of {col.title()} (Density)', fontsize=12)
             plots[f'Violin_{col}'] = fig_violin
 
@@ -100,7 +116,7 @@ def generate_correlation_matrix(df):
     if numeric_df.empty or len(numeric_df.columns) < 2:
         return None
         
-    corr_matrix = numeric_df.corr()
+    corr_matrix = correlation_matrix(numeric_df)
     
     # Create the heatmap plot with enhanced aesthetics
     fig, ax = plt.subplots(figsize=(10, 8))
@@ -217,7 +233,9 @@ def perform_bivariate_analysis(df, col1, col2):
 
         with col_scatter:
             fig, ax = plt.subplots(figsize=(10, 6))
-            sns.scatterplot(x=df[col1], y=df[col2], ax=ax, color=PALETTE_PRIMARY, alpha=0.6)
+            draw_scatter(ax, df[col1], df[col2], color=PALETTE_PRIMARY, alpha=0.6)
+            ax.set_xlabel(col1)
+            ax.set_ylabel(col2)
             ax.set_title(f'Scatter Plot of {col1.title()} vs {col2.title()}')
             st.pyplot(fig)
             
@@ -229,7 +247,8 @@ def perform_bivariate_analysis(df, col1, col2):
         
         if df[categorical_col].nunique() <= 15: # Limit for readability
             fig, ax = plt.subplots(figsize=(12, 6))
-            sns.boxplot(x=df[categorical_col], y=df[numeric_col], ax=ax, palette="Set2") 
+            stats = grouped_box_stats(df, categorical_col, numeric_col)
+            draw_boxes(ax, stats, colors=sns.color_palette("Set2", len(stats)))
             ax.set_title(f'Distribution of {numeric_col.title()} Grouped by {categorical_col.title()}', fontsize=14)
             ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right')
             st.pyplot(fig)
@@ -296,7 +315,7 @@ def analyze_target_variable(df, target_col):
     
     fig, ax = plt.subplots(figsize=(10, 5))
     if is_target_num:
-        sns.histplot(df[target_col].dropna(), kde=True, bins=30, ax=ax, color=PALETTE_PRIMARY)
+        draw_histogram(ax, *histogram_data(df[target_col], bins=30), color=PALETTE_PRIMARY)
         ax.set_title(f'Distribution of Target: {target_col.title()}')
         st.info("For Regression: Check for normality, skewness, and high variance.")
     else:
@@ -354,14 +373,18 @@ def analyze_target_variable(df, target_col):
             
             if is_target_num and is_feature_num:
                 # Num vs Num -> Scatter
-                sns.scatterplot(x=df[feature], y=df[target_col], ax=ax, color=PALETTE_PRIMARY, alpha=0.6)
+                draw_scatter(ax, df[feature], df[target_col], color=PALETTE_PRIMARY, alpha=0.6)
+                ax.set_xlabel(feature)
+                ax.set_ylabel(target_col)
             elif is_target_num and not is_feature_num:
                 # Num vs Cat -> Box Plot
-                sns.boxplot(x=df[feature], y=df[target_col], ax=ax, palette="Set2")
+                stats = grouped_box_stats(df, feature, target_col)
+                draw_boxes(ax, stats, colors=sns.color_palette("Set2", len(stats)))
                 ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right')
             elif not is_target_num and is_feature_num:
                 # Cat vs Num -> Box Plot
-                sns.boxplot(x=df[target_col], y=df[feature], ax=ax, palette="Set2")
+                stats = grouped_box_stats(df, target_col, feature)
+                draw_boxes(ax, stats, colors=sns.color_palette("Set2", len(stats)))
                 ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right')
             elif not is_target_num and not is_feature_num:
                 # Cat vs Cat -> Stacked Bar (or Count Plot on both)
@@ -1,9 +1,14 @@
 import argparse
 import os
-from concurrent.futures import ThreadPoolExecutor
+
+from agents.agent_scheduler import AgentScheduler
+from agents.llm_client import total_cache_stats
+from tools.memory_tools import initialize_memory_bank
 
 # === Agents ===
 from agents.data_profiler_agent import DataProfilerAgent
+from agents.schema_analyzer_agent import SchemaAnalyzerAgent
+from agents.dtype_optimizer_agent import DtypeOptimizerAgent
 from agents.data_cleaner_agent import DataCleanerAgent
 # Corrected Agent Imports for Parallel Execution
 from agents.internal_insights_agent import InternalInsightsAgent
@@ -25,6 +30,39 @@ def parse_args():
         required=True,
         help="Path to input CSV file"
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the CSV in chunks of this many rows: profiling and the raw data stay "
+             "within one chunk of memory, but the cleaned data is still held in memory in full"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-parse the CSV, re-query the LLM and re-render plots instead of using the caches"
+    )
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Clean the raw data in place and release it from memory once cleaned"
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Trace the memory allocated while cleaning (tracemalloc; slows the cleaning step)"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only parse, profile and clean the rows appended to the CSV since the last --incremental run"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["auto", "thread", "process", "inline", "async"],
+        default="auto",
+        help="Run every agent on this backend instead of each agent's own default"
+    )
     return parser.parse_args()
 
 
@@ -37,12 +75,8 @@ def setup_environment():
     os.makedirs("reports/plots", exist_ok=True)
     os.makedirs("reports/ml", exist_ok=True)  # New ML output folder
 
-    memory_path = "reports/memory_bank.json"
-
-    if not os.path.exists(memory_path):
-        # Initialize memory bank if missing
-        with open(memory_path, "w") as f:
-            f.write('{"past_insights": []}')
+    # Initialize memory bank if missing (imports a legacy memory_bank.json)
+    initialize_memory_bank()
 
     # Clear old report files before a new run
     if os.path.exists("reports/final_analysis_report.md"):
@@ -52,25 +86,29 @@ def setup_environment():
 
 
 # ======================================================
-# 3. RUN WRAPPER FOR PARALLEL AGENTS
+# 3. AGENT GRAPH
 # ======================================================
-def run_agent_wrapper(agent_class, context):
-    try:
-        # Run agent instance and return success status
-        return agent_class().run(context)
-    except Exception as e:
-        print(f"Error in {agent_class.__name__}: {str(e)}")
-        # Return False or None to indicate failure
-        return False
+# Order only breaks ties; the scheduler derives the actual execution order
+# from each agent's declared reads/writes, so ML overlaps with the LLM-bound
+# insight and external-context calls.
+PIPELINE_AGENTS = [
+    DataProfilerAgent,
+    SchemaAnalyzerAgent,
+    DtypeOptimizerAgent,
+    DataCleanerAgent,
+    InternalInsightsAgent,
+    ExternalContextAgent,
+    VisualizationAgent,
+    MLAgent,
+    RecommendationAgent,
+    ReportWriterAgent,
+]
 
 
 # ======================================================
 # 4. MAIN PIPELINE
 # ======================================================
 def main():
-    # Placeholder for LLM Client Configuration (assuming it's here in the full file)
-    # print("--- LLM Client configured successfully ---")
-
     args = parse_args()
     csv_path = args.file
 
@@ -79,76 +117,25 @@ def main():
     # Shared session state
     context = {
         "data_path": csv_path,
-        # Initialize other context variables if needed, e.g., 'ml_reports': {}
+        "chunksize": args.chunksize,
+        "use_cache": not args.no_cache,
+        "low_memory": args.low_memory,
+        "profile_memory": args.profile_memory,
+        "incremental": args.incremental,
     }
 
-    # ==================================================
-    # Step 1 — Sequential: Profiler Agent
-    # ==================================================
-    print("\n=== 1. SEQUENTIAL: Data Profiler Agent Running ===")
-    if not DataProfilerAgent().run(context):
-        print("Profiler Agent failed. Aborting.")
-        return
-    print("Profiler Agent Finished.")
-
-    # ==================================================
-    # Step 2 — Sequential: Data Cleaner Agent
-    # ==================================================
-    print("\n=== 2. SEQUENTIAL: Data Cleaner Agent Running ===")
-    if not DataCleanerAgent().run(context):
-        print("Data Cleaner Agent failed. Aborting.")
+    backend_override = None if args.executor == "auto" else args.executor
+    status = AgentScheduler(PIPELINE_AGENTS, max_workers=4,
+                            backend_override=backend_override).run(context)
+
+    if context["use_cache"]:
+        cache_stats = total_cache_stats(context)
+        print(f"--- LLM response cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es) ---")
+
+    if status.get(ReportWriterAgent.__name__) != "success":
+        print("\n--- ❌ Enterprise Data Analysis Pipeline stopped before the report was written ---")
         return
-    print("Cleaner Agent Finished.")
-
-    # ==================================================
-    # Step 3 — Parallel: Insights, Search, Visualization
-    # ==================================================
-    print("\n\n=== 3. PARALLEL EXECUTION: Insights / Search / Viz ===")
-
-    parallel_agents = [
-        InternalInsightsAgent,  # Renamed from InsightsAgent
-        ExternalContextAgent,  # Renamed from SearchAgent
-        VisualizationAgent
-    ]
-
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = [
-            executor.submit(run_agent_wrapper, agent, context)
-            for agent in parallel_agents
-        ]
-        results = [f.result() for f in futures]  # Wait for all results
-
-    if all(results):
-        print("Parallel Agents Finished.")
-    else:
-        print("Warning: One or more parallel agents failed.")
-
-    # ==================================================
-    # Step 4 — ML Agent (Sequential)
-    # ==================================================
-    print("\n=== 4. SEQUENTIAL: ML Agent Running ===")
-    ml_agent = MLAgent()
-    if not ml_agent.run(context):
-        print("ML Agent failed. Aborting recommendations.")
-    else:
-        print("ML Agent Finished.")
-
-        # ==================================================
-        # Step 5 — Recommendation Agent (Sequential)
-        # ==================================================
-        print("\n=== 5. SEQUENTIAL: Recommendation Agent Running ===")
-        rc_agent = RecommendationAgent()
-        if not rc_agent.run(context):
-            print("Recommendation Agent failed.")
-        else:
-            print("Recommendation Agent Finished.")
-
-    # ==================================================
-    # Step 6 — Report Writer
-    # ==================================================
-    print("\n=== 6. Report Writer Agent Running ===")
-    ReportWriterAgent().run(context)
-    print("Report Writer Agent Finished.")
+
     print("\n--- ✅ Enterprise Data Analysis Pipeline Finished ---")
     print("Final Report saved to: reports/final_analysis_report.md")
 
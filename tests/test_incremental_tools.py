@@ -0,0 +1,41 @@
+import pandas as pd
+
+from tools import incremental_tools
+from tools.data_tools import compute_chunk_stats, dataset_fingerprint, merge_column_stats
+
+
+def _run(csv_path):
+    new_rows, profile, pending = incremental_tools.begin_incremental_update(str(csv_path))
+    cleaned_df, _ = incremental_tools.clean_incremental_update(new_rows, pending, profile)
+    return profile, cleaned_df
+
+
+def test_unchanged_file_keeps_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental_tools, "INCREMENTAL_DIR", str(tmp_path / "state"))
+    csv_path = tmp_path / "sales.csv"
+    csv_path.write_text("Region,Price,Quantity\nNorth,1.5,3\nSouth,2.5,\nEast,4.0,7\n")
+
+    first, _ = _run(csv_path)
+    second, _ = _run(csv_path)
+    assert second["data_types"] == first["data_types"]
+    assert second["summary_stats"]["Price"]["mean"] == first["summary_stats"]["Price"]["mean"]
+    assert dataset_fingerprint(second) == dataset_fingerprint(first)
+
+    # Appending after a no-op run still merges into the numeric stats and imputes
+    with open(csv_path, "a") as f:
+        f.write("West,6.0,\n")
+    third, cleaned_df = _run(csv_path)
+    assert third["data_types"]["Price"] == first["data_types"]["Price"]
+    assert third["summary_stats"]["Price"]["mean"] == 3.5
+    assert not cleaned_df["Quantity"].isna().any()
+
+
+def test_merge_ignores_type_of_chunk_without_values():
+    numeric = compute_chunk_stats(pd.DataFrame({"Price": [1.0, 3.0]}))
+    empty = compute_chunk_stats(pd.DataFrame({"Price": pd.Series([None], dtype=object)}))
+
+    for merged in (merge_column_stats(numeric, empty), merge_column_stats(empty, numeric)):
+        assert merged["Price"]["dtype"] == "float64"
+        assert merged["Price"]["mean"] == 2.0
+        assert merged["Price"]["count"] == 2
+        assert merged["Price"]["missing"] == 1
@@ -1,51 +1,651 @@
+import hashlib
+import json
+import os
+import re
+import warnings
+
 import pandas as pd
 import numpy as np
 
+from tools.sketch_tools import (
+    hll_registers,
+    hll_merge,
+    hll_estimate,
+    sample_values,
+    merge_samples,
+    estimate_distinct,
+)
+
+try:
+    # Optional: enables the columnar (Arrow/Feather) cache of parsed CSVs
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+# Parsed CSVs are cached here as uncompressed Feather files keyed by content hash
+CACHE_DIR = os.path.join("reports", "cache")
+CACHE_INDEX_FILE = os.path.join(CACHE_DIR, "index.json")
+
+# Numeric quartiles, distinct counts and top values come from a uniform row
+# sample of PROFILE_SAMPLE_SIZE rows, so their cost does not grow with the data.
+PROFILE_SAMPLE_SIZE = 20_000
+
+
+def _coerce_known_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Makes sure known target columns are numeric so cleaning can rely on them."""
+    # Simple check for 'charges' or 'TotalSale' to ensure it's numeric for cleaning
+    if 'charges' in df.columns:
+        df['charges'] = pd.to_numeric(df['charges'], errors='coerce')
+    return df
+
+
+def file_content_hash(path: str, block_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 hex digest of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cached_content_hash(csv_path: str) -> str:
+    """
+    Content hash of csv_path, remembered per (path, size, mtime) in the cache
+    index so an unchanged file is not re-read just to find its cache entry.
+    """
+    stat = os.stat(csv_path)
+    file_key = f"{os.path.abspath(csv_path)}|{stat.st_size}|{stat.st_mtime_ns}"
 
-def load_data(csv_path: str) -> pd.DataFrame:
-    """Loads a CSV file from the given path."""
+    index = {}
+    if os.path.exists(CACHE_INDEX_FILE):
+        try:
+            with open(CACHE_INDEX_FILE, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except Exception:
+            index = {}
+
+    if file_key not in index:
+        index[file_key] = file_content_hash(csv_path)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(CACHE_INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+    return index[file_key]
+
+
+def load_data(csv_path: str, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Loads a CSV file from the given path.
+
+    With pyarrow installed the parsed frame (including inferred dtypes) is
+    cached as an uncompressed Feather file under reports/cache, keyed by the
+    file's content hash. Later runs on the same file memory-map the cache
+    instead of re-parsing the CSV.
+    """
     print(f"--- [TOOL:Data] Loading data from {csv_path} ---")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found at path: {csv_path}")
+
+    cache_path = None
+    if use_cache and feather is not None:
+        cache_path = os.path.join(CACHE_DIR, f"{_cached_content_hash(csv_path)}.feather")
+        if os.path.exists(cache_path):
+            try:
+                df = feather.read_table(cache_path, memory_map=True).to_pandas()
+                print(f"--- [TOOL:Data] Loaded columnar cache {cache_path} ---")
+                return df
+            except Exception as e:
+                print(f"Data Tool Warning: Ignoring unreadable cache {cache_path}: {e}")
+
     try:
         df = pd.read_csv(csv_path)
     except FileNotFoundError:
         raise FileNotFoundError(f"CSV file not found at path: {csv_path}")
 
-    # Simple check for 'charges' or 'TotalSale' to ensure it's numeric for cleaning
-    if 'charges' in df.columns:
-        df['charges'] = pd.to_numeric(df['charges'], errors='coerce')
+    df = _coerce_known_numeric(df)
+
+    if cache_path:
+        try:
+            # Write-then-rename so a concurrent run never sees a partial file
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            feather.write_feather(df, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, cache_path)
+            print(f"--- [TOOL:Data] Wrote columnar cache {cache_path} ---")
+        except Exception as e:
+            print(f"Data Tool Warning: Could not write columnar cache: {e}")
 
     return df
 
 
-def clean_data(df_raw: pd.DataFrame) -> pd.DataFrame:
-    """Performs basic data cleaning (imputation, dropping duplicates)."""
-    df = df_raw.copy()
+def write_arrow_ipc(df: pd.DataFrame, path: str) -> str:
+    """
+    Writes a DataFrame as an uncompressed Arrow IPC (Feather v2) file that
+    other processes can memory-map with read_arrow_ipc instead of unpickling.
+    """
+    if feather is None:
+        raise ImportError("pyarrow is required for Arrow IPC transfer.")
+    feather.write_feather(df, path, compression="uncompressed")
+    return path
 
-    # Impute missing numeric data with the mean
-    for col in df.select_dtypes(include=[np.number]).columns:
-        df[col] = df[col].fillna(df[col].mean())
 
-    # Drop rows with remaining NaNs (usually from object/string columns)
-    df.dropna(inplace=True)
+def read_arrow_ipc(path: str) -> pd.DataFrame:
+    """Memory-maps an Arrow IPC file written by write_arrow_ipc."""
+    return feather.read_table(path, memory_map=True).to_pandas()
 
-    # Ensure charges (our target) is numeric
-    if 'charges' in df.columns:
-        df['charges'] = pd.to_numeric(df['charges'], errors='coerce')
-        df.dropna(subset=['charges'], inplace=True)
 
-    # Drop duplicates
-    df.drop_duplicates(inplace=True)
+def load_data_chunks(csv_path: str, chunksize: int):
+    """
+    Streams a CSV file in DataFrame chunks of at most `chunksize` rows, so that
+    only one chunk is held in memory at a time.
+    """
+    print(f"--- [TOOL:Data] Streaming data from {csv_path} in chunks of {chunksize} rows ---")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found at path: {csv_path}")
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        yield _coerce_known_numeric(chunk)
+
+
+def optimize_dtypes(df: pd.DataFrame, max_category_ratio: float = 0.5) -> tuple[pd.DataFrame, dict]:
+    """
+    Shrinks a DataFrame's memory footprint without changing its values:
+    low-cardinality string columns become 'category', integers are downcast
+    to the smallest width that holds their range, and floats are downcast to
+    float32 only where that round-trips exactly.
+
+    Returns the optimised frame and a report with before/after memory usage.
+    """
+    memory_before = int(df.memory_usage(deep=True).sum())
+    converted = {}
+
+    for col in df.columns:
+        series = df[col]
+        old_dtype = str(series.dtype)
+
+        if pd.api.types.is_bool_dtype(series):
+            continue
+
+        if pd.api.types.is_integer_dtype(series):
+            new_series = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            new_series = pd.to_numeric(series, downcast="float")
+            # Only keep float32 if no precision is lost
+            if not np.array_equal(new_series.to_numpy(dtype=np.float64),
+                                  series.to_numpy(dtype=np.float64), equal_nan=True):
+                continue
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            n_unique = series.nunique(dropna=True)
+            if len(series) == 0 or n_unique / len(series) > max_category_ratio:
+                continue
+            new_series = series.astype("category")
+        else:
+            continue
+
+        if str(new_series.dtype) != old_dtype:
+            df[col] = new_series
+            converted[col] = {"from": old_dtype, "to": str(new_series.dtype)}
+
+    memory_after = int(df.memory_usage(deep=True).sum())
+    report = {
+        "memory_before_bytes": memory_before,
+        "memory_after_bytes": memory_after,
+        "reduction_ratio": round(memory_before / memory_after, 2) if memory_after else None,
+        "converted_columns": converted,
+    }
+    return df, report
 
+
+def _duplicated_rows(df: pd.DataFrame, mask: np.ndarray = None) -> np.ndarray:
+    """
+    Same result as df[mask].duplicated() (aligned to all rows of df), but
+    exact comparison only runs on rows whose 64-bit row hash collides, which
+    needs far less scratch memory than factorising every column of the frame.
+    """
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    positions = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+    candidates = pd.Series(row_hash[positions]).duplicated(keep=False).to_numpy()
+
+    duplicated = np.zeros(len(df), dtype=bool)
+    if candidates.any():
+        candidate_positions = positions[candidates]
+        duplicated[candidate_positions] = df.iloc[candidate_positions].duplicated().to_numpy()
+    return duplicated
+
+
+def clean_data(df_raw: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    """
+    Performs basic data cleaning (imputation, dropping incomplete rows and
+    duplicates) in one vectorised pass.
+
+    Numeric NaNs are imputed with column means computed in a single
+    reduction, and incomplete and duplicate rows are removed with a single
+    row selection, so the kept rows are materialised at most once. With
+    inplace=True `df_raw` itself is imputed and filtered and no copy is made.
+    """
+    null_counts = df_raw.isna().sum()
+    null_cols = null_counts.index[null_counts > 0]
+
+    # One reduction for every numeric column that actually needs imputing;
+    # all-NaN columns have no mean and fall through to row dropping
+    numeric_null_cols = df_raw[null_cols].select_dtypes(include=[np.number]).columns
+    means = df_raw[numeric_null_cols].mean().dropna().to_dict()
+    unfillable = null_cols.difference(list(means), sort=False)
+    complete = df_raw[unfillable].notna().all(axis=1).to_numpy() if len(unfillable) else None
+
+    # 'charges' is already coerced to numeric by load_data/load_data_chunks
+    if inplace:
+        df = df_raw
+        if means:
+            df.fillna(means, inplace=True)
+        drop = _duplicated_rows(df, complete)
+        if complete is not None:
+            drop |= ~complete
+        if drop.any():
+            if df.index.is_unique:
+                df.drop(index=df.index[drop], inplace=True)
+            else:
+                df.dropna(subset=unfillable, inplace=True)
+                df.drop_duplicates(inplace=True)
+        return df
+
+    df = df_raw.loc[complete] if complete is not None else df_raw.copy()
+    if means:
+        df.fillna(means, inplace=True)
+    duplicated = _duplicated_rows(df)
+    if duplicated.any():
+        df = df[~duplicated]
     return df
 
 
+def clean_data_chunks(csv_path: str, chunksize: int, fill_values: dict) -> pd.DataFrame:
+    """
+    Streaming counterpart of clean_data. Each chunk is imputed with the
+    dataset-wide means in `fill_values` (computed by the streaming profile),
+    filtered and de-duplicated before it is kept, so the raw file is never
+    fully materialised. The cleaned rows are still returned as one in-memory
+    frame (the downstream agents work on a DataFrame), so peak memory grows
+    with the size of the cleaned data.
+    """
+    cleaned_chunks = []
+    for chunk in load_data_chunks(csv_path, chunksize):
+        chunk = chunk.fillna({col: val for col, val in fill_values.items() if col in chunk.columns})
+        chunk.dropna(inplace=True)
+        chunk.drop_duplicates(inplace=True)
+        cleaned_chunks.append(chunk)
+
+    if not cleaned_chunks:
+        return pd.DataFrame()
+
+    df = pd.concat(cleaned_chunks)
+    # Duplicates can still span chunk boundaries
+    df.drop_duplicates(inplace=True)
+    return df
+
+
+def _top_value(counts: pd.Series, scale: float = 1.0) -> dict:
+    """Most frequent value from an (unsorted) value_counts() result, scaled up for samples."""
+    if counts.empty:
+        return {}
+    top = counts.idxmax()
+    return {"top": top, "freq": int(round(counts[top] * scale))}
+
+
+def _sorted_sample_stats(ordered: np.ndarray, population: np.ndarray, scale: np.ndarray) -> tuple:
+    """
+    Quartiles, distinct-count estimates and top values per row of a sample
+    block sorted along axis 1 (NaNs last), without another sort or hash.
+    """
+    valid = np.count_nonzero(~np.isnan(ordered), axis=1)
+    # Linear interpolation between order statistics, as np.quantile does
+    position = np.maximum(valid - 1, 0)[:, None] * np.array([0.25, 0.5, 0.75])
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, np.maximum(valid - 1, 0)[:, None])
+    rows = np.arange(len(ordered))[:, None]
+    low_values, high_values = ordered[rows, lower], ordered[rows, upper]
+    quartiles = low_values + (high_values - low_values) * (position - lower)
+    quartiles[valid == 0] = np.nan
+
+    distinct, tops = [], []
+    for i, row in enumerate(ordered):
+        row = row[:valid[i]]
+        if not len(row):
+            distinct.append(0)
+            tops.append({})
+            continue
+        # Runs of equal values in the sorted sample are the value frequencies
+        starts = np.flatnonzero(np.r_[True, row[1:] != row[:-1]])
+        frequencies = np.diff(np.r_[starts, len(row)])
+        distinct.append(estimate_distinct(frequencies, int(population[i])))
+        top = int(np.argmax(frequencies))
+        tops.append({"top": row[starts[top]].item(), "freq": int(round(frequencies[top] * scale[i]))})
+    return quartiles, distinct, tops
+
+
 def get_data_profile(df: pd.DataFrame) -> dict:
-    """Generates a basic data profile summary."""
+    """
+    Generates a data profile summary in a single fused scan: count, missing,
+    mean, std, min/max, quartiles, distinct count and top value per column.
+
+    Numeric columns are summarised together as one float block. Their exact
+    moments and extremes take one pass over the data; their quartiles,
+    distinct counts and top values come from one sort of a bounded uniform
+    row sample (the whole column up to PROFILE_SAMPLE_SIZE rows, where they
+    are exact). Non-numeric columns are hashed once with value_counts, which
+    yields both their distinct count and top value.
+    """
+    n_rows = len(df)
+    sample_rows = None
+    if n_rows > PROFILE_SAMPLE_SIZE:
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(n_rows, size=PROFILE_SAMPLE_SIZE, replace=False))
+
+    missing = df.isna().sum()
+    summary_stats = {col: {"count": int(n_rows - missing[col])} for col in df.columns}
+
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    if len(numeric_cols) > 0:
+        # One contiguous row per column keeps every reduction cache-friendly
+        values = np.ascontiguousarray(
+            df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan).T)
+        ordered = np.sort(values if sample_rows is None else values[:, sample_rows], axis=1)
+        counts = (n_rows - missing[numeric_cols]).to_numpy()
+        with warnings.catch_warnings():
+            # All-NaN and single-value columns are expected here and yield NaN
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            if missing[numeric_cols].any():
+                means = np.nanmean(values, axis=1)
+                stds = np.nanstd(values, axis=1, ddof=1)
+                mins = np.nanmin(values, axis=1)
+                maxs = np.nanmax(values, axis=1)
+            else:
+                # The NaN-aware reductions copy and mask the block
+                means = values.mean(axis=1)
+                stds = values.std(axis=1, ddof=1)
+                mins = values.min(axis=1)
+                maxs = values.max(axis=1)
+        del values
+        sampled = np.count_nonzero(~np.isnan(ordered), axis=1)
+        quartiles, distinct, tops = _sorted_sample_stats(ordered, counts, counts / np.maximum(sampled, 1))
+
+        for i, col in enumerate(numeric_cols):
+            summary_stats[col].update({
+                "mean": float(means[i]),
+                "std": float(stds[i]),
+                "min": float(mins[i]),
+                "25%": float(quartiles[i, 0]),
+                "50%": float(quartiles[i, 1]),
+                "75%": float(quartiles[i, 2]),
+                "max": float(maxs[i]),
+                "unique": distinct[i],
+            })
+            summary_stats[col].update(tops[i])
+
+    for col in df.columns.difference(numeric_cols, sort=False):
+        counts = df[col].value_counts(dropna=True, sort=False)
+        summary_stats[col]["unique"] = int(len(counts))
+        summary_stats[col].update(_top_value(counts))
+
     profile = {
         "shape": df.shape,
         "columns": list(df.columns),
         "data_types": df.dtypes.astype(str).to_dict(),
-        "missing_values": df.isnull().sum().to_dict(),
-        "summary_stats": df.describe(include='all').to_dict()
+        "missing_values": missing.to_dict(),
+        "summary_stats": summary_stats,
+        "profile_method": "exact" if sample_rows is None else "sketch",
     }
     return profile
+
+
+# ======================================================
+# Streaming (mergeable) profile statistics
+# ======================================================
+def compute_chunk_stats(chunk: pd.DataFrame, rng: np.random.Generator = None) -> dict:
+    """
+    Computes mergeable per-column statistics for one chunk: counts, missing
+    counts, a HyperLogLog sketch, a bounded uniform value sample and, for
+    numeric columns, mean, M2 (sum of squared deviations), min and max.
+    Partial results are combined with merge_column_stats.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    missing = chunk.isna().sum()
+    stats = {
+        col: {
+            "dtype": str(chunk[col].dtype),
+            "count": int(len(chunk) - missing[col]),
+            "missing": int(missing[col]),
+            "hll": hll_registers(chunk[col]),
+            "sample": sample_values(chunk[col].dropna().to_numpy(), PROFILE_SAMPLE_SIZE, rng),
+        }
+        for col in chunk.columns
+    }
+
+    numeric_cols = chunk.select_dtypes(include=[np.number]).columns
+    if len(numeric_cols) > 0:
+        values = chunk[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        with warnings.catch_warnings():
+            # All-NaN columns are expected here and simply yield NaN
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            means = np.nanmean(values, axis=0)
+            m2 = np.nansum((values - means) ** 2, axis=0)
+            mins = np.nanmin(values, axis=0)
+            maxs = np.nanmax(values, axis=0)
+
+        for i, col in enumerate(numeric_cols):
+            has_values = stats[col]["count"] > 0
+            stats[col].update({
+                "mean": float(means[i]) if has_values else 0.0,
+                "m2": float(m2[i]) if has_values else 0.0,
+                "min": float(mins[i]) if has_values else np.nan,
+                "max": float(maxs[i]) if has_values else np.nan,
+            })
+
+    return stats
+
+
+def _merge_dtype(left: str, right: str, numeric: bool) -> str:
+    # e.g. int64 in one chunk and float64 (because of NaNs) in another
+    if left == right:
+        return left
+    return "float64" if numeric else "object"
+
+
+def merge_column_stats(left: dict, right: dict, rng: np.random.Generator = None) -> dict:
+    """
+    Merges two per-column stat dicts produced by compute_chunk_stats using the
+    parallel mean/variance update (Chan et al.), register-wise HyperLogLog
+    maxima and weighted sample merging. The result is itself mergeable.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    merged = {}
+    for col in list(left) + [c for c in right if c not in left]:
+        if col not in left or col not in right:
+            merged[col] = dict(left.get(col) or right[col])
+            continue
+
+        a, b = left[col], right[col]
+        if not a["count"] or not b["count"]:
+            # A part without non-null values (e.g. an empty chunk, which
+            # parses as object) says nothing about the column's type
+            typed, other = (b, a) if b["count"] and not a["count"] else (a, b)
+            merged[col] = dict(typed, missing=a["missing"] + b["missing"],
+                               hll=hll_merge(typed["hll"], other["hll"]))
+            continue
+
+        numeric = "mean" in a and "mean" in b
+        entry = {
+            "dtype": _merge_dtype(a["dtype"], b["dtype"], numeric),
+            "count": a["count"] + b["count"],
+            "missing": a["missing"] + b["missing"],
+            "hll": hll_merge(a["hll"], b["hll"]),
+            "sample": merge_samples(a["sample"], a["count"], b["sample"], b["count"],
+                                    PROFILE_SAMPLE_SIZE, rng),
+        }
+
+        # Numeric stats only survive if the column was numeric in both parts
+        if numeric:
+            n_a, n_b = a["count"], b["count"]
+            n = n_a + n_b
+            if n == 0:
+                entry.update(mean=0.0, m2=0.0, min=np.nan, max=np.nan)
+            else:
+                delta = b["mean"] - a["mean"]
+                entry.update(
+                    mean=a["mean"] + delta * n_b / n,
+                    m2=a["m2"] + b["m2"] + delta ** 2 * n_a * n_b / n,
+                    min=float(np.fmin(a["min"], b["min"])),
+                    max=float(np.fmax(a["max"], b["max"])),
+                )
+        merged[col] = entry
+
+    return merged
+
+
+def profile_from_stats(n_rows: int, stats: dict) -> dict:
+    """Builds a get_data_profile-shaped report from merged streaming stats."""
+    summary_stats = {}
+    for col, entry in stats.items():
+        count = entry["count"]
+        sample = entry["sample"]
+        col_summary = {"count": count}
+        if "mean" in entry:
+            quartiles = (np.quantile(sample.astype(np.float64), [0.25, 0.5, 0.75])
+                         if len(sample) else [np.nan] * 3)
+            col_summary.update({
+                "mean": entry["mean"] if count else np.nan,
+                "std": float(np.sqrt(entry["m2"] / (count - 1))) if count > 1 else np.nan,
+                "min": entry["min"],
+                "25%": float(quartiles[0]),
+                "50%": float(quartiles[1]),
+                "75%": float(quartiles[2]),
+                "max": entry["max"],
+            })
+        col_summary["unique"] = hll_estimate(entry["hll"])
+        if len(sample):
+            col_summary.update(_top_value(pd.Series(sample).value_counts(sort=False), count / len(sample)))
+        summary_stats[col] = col_summary
+
+    return {
+        "shape": (n_rows, len(stats)),
+        "columns": list(stats),
+        "data_types": {col: entry["dtype"] for col, entry in stats.items()},
+        "missing_values": {col: entry["missing"] for col, entry in stats.items()},
+        "summary_stats": summary_stats,
+        "profile_method": "streaming",
+    }
+
+
+def get_data_profile_streaming(csv_path: str, chunksize: int) -> dict:
+    """
+    Generates the same profile as get_data_profile while reading the CSV in
+    chunks, so peak memory is bounded by `chunksize` rather than the file size.
+    """
+    rng = np.random.default_rng(0)
+    n_rows = 0
+    stats = {}
+    for chunk in load_data_chunks(csv_path, chunksize):
+        n_rows += len(chunk)
+        stats = merge_column_stats(stats, compute_chunk_stats(chunk, rng), rng)
+
+    return profile_from_stats(n_rows, stats)
+
+
+def _dtype_kind(dtype) -> str:
+    """'numeric', 'datetime', 'bool' or 'string' for a dtype name."""
+    name = str(dtype).lower()
+    if name.startswith("bool"):
+        return "bool"
+    if name.startswith(("datetime", "timedelta", "period")):
+        return "datetime"
+    if name.startswith(("int", "uint", "float", "complex")):
+        return "numeric"
+    return "string"
+
+
+def dataset_fingerprint(profile: dict) -> str:
+    """
+    Schema fingerprint of a dataset: a hash of its column names and dtype
+    kinds (numeric, datetime, bool or string). Kinds rather than dtypes keep
+    the fingerprint the same whichever profiling path (exact, streaming or
+    incremental) reported them, e.g. int64 in one and float64 in another.
+    Different files (or versions of a file) with the same schema share a
+    fingerprint.
+    """
+    schema = [[col, _dtype_kind(profile["data_types"].get(col))] for col in profile["columns"]]
+    return hashlib.sha256(json.dumps(schema).encode("utf-8")).hexdigest()[:16]
+
+
+# Column-name hints for analyze_schema, in priority order
+TARGET_COLUMN_HINTS = ("totalsale", "charges", "sales", "revenue")
+GROUP_COLUMN_HINTS = ("region", "smoker")
+PRODUCT_COLUMN_HINTS = ("category", "sku", "product")  # Per-product forecasts and demand
+REGION_COLUMN_HINTS = ("region",)  # Per-region forecasts
+GROUP_CARDINALITY_RANGE = (2, 10)  # Distinct values of a useful group-by column
+ID_UNIQUE_FRACTION = 0.95  # Non-numeric columns this close to all-distinct are identifiers
+
+
+def _is_id_name(col: str) -> bool:
+    # "id" as a separate word or a camelCase suffix ("customer_id", "CustomerId",
+    # "CustomerID"), not the letters that end "PAID" or "VOID"
+    lowered = col.lower()
+    return (lowered == "id" or lowered.endswith(("_id", " id", "-id"))
+            or re.search(r"[a-z](Id|ID)$", col) is not None)
+
+
+def analyze_schema(profile: dict) -> dict:
+    """
+    Assigns column roles (date, target, quantity, category, product, region,
+    ids) from a data profile, so agents share one answer instead of each
+    re-scanning the frame. 'category' is the low-cardinality group-by column
+    for plots; 'product' and 'region' are matched by name alone (any number
+    of values) and are the series of the per-group ML models.
+
+    Cardinalities are the profile's distinct counts (exact, or sample and
+    HyperLogLog estimates for large and streamed inputs); no data is read.
+    """
+    columns = profile["columns"]
+    dtypes = profile["data_types"]
+    stats = profile["summary_stats"]
+    n_rows = profile["shape"][0]
+
+    cardinality = {col: int(stats.get(col, {}).get("unique", 0)) for col in columns}
+    # Only numeric columns carry a mean in the profile
+    numeric = [col for col in columns if "mean" in stats.get(col, {})]
+
+    date_col = next((col for col in columns
+                     if "date" in col.lower() or str(dtypes.get(col)).startswith("datetime")), None)
+    ids = [col for col in columns if col != date_col and (
+        _is_id_name(col)
+        or (col not in numeric and n_rows > 1 and cardinality[col] >= ID_UNIQUE_FRACTION * n_rows))]
+    measures = [col for col in numeric if col not in ids and col != date_col]
+    categorical = [col for col in columns if col not in numeric and col not in ids and col != date_col]
+
+    target_col = next((col for hint in TARGET_COLUMN_HINTS for col in measures if hint in col.lower()), None)
+    if target_col is None and measures:
+        # The most distinct numeric column is the most descriptive one
+        target_col = max(measures, key=cardinality.get)
+
+    quantity_col = next((col for col in measures
+                         if "quantity" in col.lower() or "units" in col.lower()), None)
+
+    low, high = GROUP_CARDINALITY_RANGE
+    groupable = [col for col in categorical if low <= cardinality[col] <= high]
+    group_col = next((col for hint in GROUP_COLUMN_HINTS for col in groupable if col == hint),
+                     groupable[0] if groupable else None)
+
+    product_col = next((col for hint in PRODUCT_COLUMN_HINTS for col in categorical
+                        if hint in col.lower()), None)
+    region_col = next((col for hint in REGION_COLUMN_HINTS for col in categorical
+                       if hint in col.lower() and col != product_col), None)
+
+    return {
+        "date": date_col,
+        "target": target_col,
+        "quantity": quantity_col,
+        "category": group_col,
+        "product": product_col,
+        "region": region_col,
+        "ids": ids,
+        "numeric": measures,
+        "categorical": categorical,
+        "cardinality": cardinality,
+    }
@@ -0,0 +1,243 @@
+import hashlib
+import io
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from tools.data_tools import (
+    _coerce_known_numeric,
+    _duplicated_rows,
+    compute_chunk_stats,
+    merge_column_stats,
+    profile_from_stats,
+    write_arrow_ipc,
+    read_arrow_ipc,
+)
+
+# Incremental (append-only) processing of a growing CSV. Per input file the
+# state directory holds the byte offset processed so far, a hash of the header
+# and of the bytes just before that offset (to detect rewrites), the mergeable
+# profile statistics, and the cleaned rows as append-only Arrow segments with
+# sorted row-hash arrays for de-duplication against history. A run parses,
+# profiles and cleans only the bytes appended since the previous run.
+# Edits further back than TAIL_CHECK_BYTES are not detected (checking them
+# would mean re-reading the history); delete the state directory after
+# rewriting a file in place.
+INCREMENTAL_DIR = os.path.join("reports", "cache", "incremental")
+TAIL_CHECK_BYTES = 4096  # Bytes before the stored offset that must be unchanged
+MAX_SEGMENTS = 32  # Cleaned segments are compacted into one beyond this
+
+
+def _state_dir(csv_path: str) -> str:
+    path_key = hashlib.sha256(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INCREMENTAL_DIR, path_key)
+
+
+def _read_header(csv_path: str) -> bytes:
+    with open(csv_path, "rb") as f:
+        return f.readline()
+
+
+def _bytes_digest(csv_path: str, offset: int) -> str:
+    """Hash of the TAIL_CHECK_BYTES bytes that precede `offset`."""
+    start = max(0, offset - TAIL_CHECK_BYTES)
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def _read_rows_from(csv_path: str, header: bytes, offset: int) -> tuple[pd.DataFrame, int]:
+    """
+    Parses the complete lines from byte `offset` to the end of the file. A
+    final line without a newline may still be being written; it is left for
+    the next run. Returns the rows and the offset just after the last line read.
+    """
+    with open(csv_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    data = data[:data.rfind(b"\n") + 1]
+
+    df = pd.read_csv(io.BytesIO(header + data))
+    return _coerce_known_numeric(df), offset + len(data)
+
+
+def _load_state(csv_path: str, header: bytes):
+    """The stored state for csv_path if the file is an append-only continuation of it, else None."""
+    state_file = os.path.join(_state_dir(csv_path), "state.pkl")
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, "rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"Incremental Tool Warning: Ignoring unreadable state {state_file}: {e}")
+        return None
+
+    if state["header_hash"] != hashlib.sha256(header).hexdigest():
+        print("--- [TOOL:Incremental] Header changed; rebuilding from scratch ---")
+        return None
+    if os.path.getsize(csv_path) < state["offset"] or \
+            _bytes_digest(csv_path, state["offset"]) != state["tail_digest"]:
+        print("--- [TOOL:Incremental] Previously processed data changed; rebuilding from scratch ---")
+        return None
+    return state
+
+
+def begin_incremental_update(csv_path: str) -> tuple[pd.DataFrame, dict, dict]:
+    """
+    Reads the rows appended to csv_path since the last incremental run (all
+    rows on the first run or if earlier data changed) and merges their
+    statistics into the stored profile statistics.
+
+    Returns (new raw rows, profile of the whole file, pending state). The
+    pending state is committed by clean_incremental_update.
+    """
+    print(f"--- [TOOL:Incremental] Checking {csv_path} for appended rows ---")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found at path: {csv_path}")
+
+    header = _read_header(csv_path)
+    previous = _load_state(csv_path, header)
+    offset = previous["offset"] if previous else len(header)
+
+    new_rows, end_offset = _read_rows_from(csv_path, header, offset)
+    print(f"--- [TOOL:Incremental] {len(new_rows)} new row(s) "
+          f"({end_offset - offset} bytes after offset {offset}) ---")
+
+    if previous and end_offset == offset:
+        # Nothing appended: the stored statistics are already the file's
+        stats, n_rows = previous["stats"], previous["n_rows"]
+    else:
+        rng = np.random.default_rng(end_offset)
+        stats = compute_chunk_stats(new_rows, rng)
+        n_rows = len(new_rows)
+        if previous:
+            stats = merge_column_stats(previous["stats"], stats, rng)
+            n_rows += previous["n_rows"]
+
+    profile = profile_from_stats(n_rows, stats)
+    profile["profile_method"] = "incremental"
+
+    pending = {
+        "csv_path": csv_path,
+        "previous": previous,
+        "header_hash": hashlib.sha256(header).hexdigest(),
+        "offset": end_offset,
+        "tail_digest": _bytes_digest(csv_path, end_offset),
+        "n_rows": n_rows,
+        "stats": stats,
+    }
+    return new_rows, profile, pending
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit row hashes that do not depend on storage width: numeric columns
+    are hashed as float64, so an int8 and an int64 (or float) 3 match.
+    """
+    normalized = pd.DataFrame({
+        col: (df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+              if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+              else df[col])
+        for col in df.columns
+    }, index=df.index)
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def _concat_segments(frames: list) -> pd.DataFrame:
+    """Concatenates cleaned segments, unifying categorical columns so they stay categorical."""
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+    for col in frames[0].columns:
+        if any(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames if col in frame):
+            categories = pd.Index([])
+            for frame in frames:
+                if col in frame:
+                    values = frame[col].cat.categories if isinstance(frame[col].dtype, pd.CategoricalDtype) \
+                        else pd.Index(frame[col].dropna().unique())
+                    categories = categories.append(values.difference(categories))
+            dtype = pd.CategoricalDtype(categories)
+            for i, frame in enumerate(frames):
+                if col in frame and frame[col].dtype != dtype:
+                    frames[i] = frame.assign(**{col: frame[col].astype(dtype)})
+    return pd.concat(frames, ignore_index=True)
+
+
+def _clean_new_rows(new_rows: pd.DataFrame, fill_values: dict, history_hashes: list) -> pd.DataFrame:
+    """clean_data for appended rows: impute with dataset-wide means, drop incomplete rows and duplicates."""
+    fills = {col: val for col, val in fill_values.items()
+             if col in new_rows.columns and not pd.isna(val) and new_rows[col].isna().any()}
+    df = new_rows.fillna(fills) if fills else new_rows
+    df = df.dropna()
+
+    hashes = _row_hashes(df)
+    drop = _duplicated_rows(df)
+    for segment_hashes in history_hashes:
+        if not len(segment_hashes):
+            continue
+        # Sorted per segment: a binary search per new row, not a pass over history
+        positions = np.searchsorted(segment_hashes, hashes).clip(max=len(segment_hashes) - 1)
+        drop |= segment_hashes[positions] == hashes
+    return df[~drop]
+
+
+def clean_incremental_update(new_rows: pd.DataFrame, pending: dict, profile: dict) -> tuple[pd.DataFrame, int]:
+    """
+    Cleans the appended rows, stores them as a new segment, commits the
+    pending state and returns (all cleaned rows, position of the first new row).
+
+    New rows are imputed with the current dataset-wide means; rows cleaned on
+    earlier runs keep the values they were imputed with. Rows duplicating
+    earlier data are detected by 64-bit row hash.
+    """
+    state_dir = _state_dir(pending["csv_path"])
+    os.makedirs(state_dir, exist_ok=True)
+    previous = pending["previous"]
+    if previous is None:
+        # Fresh build: drop segments from an invalidated state
+        for name in os.listdir(state_dir):
+            os.remove(os.path.join(state_dir, name))
+    segments = list(previous["segments"]) if previous else []
+
+    history_hashes = [np.load(os.path.join(state_dir, f"{name}.hashes.npy"), mmap_mode="r")
+                      for name in segments]
+    fill_values = {col: entry.get("mean") for col, entry in profile["summary_stats"].items()
+                   if "mean" in entry}
+    cleaned_new = _clean_new_rows(new_rows, fill_values, history_hashes)
+
+    history = [read_arrow_ipc(os.path.join(state_dir, f"{name}.arrow")) for name in segments]
+    new_rows_start = sum(len(frame) for frame in history)
+
+    if len(cleaned_new):
+        name = f"segment-{(previous or {}).get('next_segment', 0):06d}"
+        write_arrow_ipc(cleaned_new.reset_index(drop=True), os.path.join(state_dir, f"{name}.arrow"))
+        np.save(os.path.join(state_dir, f"{name}.hashes.npy"), np.sort(_row_hashes(cleaned_new)))
+        segments.append(name)
+
+    cleaned_df = _concat_segments(history + [cleaned_new])
+
+    next_segment = (previous or {}).get("next_segment", 0) + 1
+    if len(segments) > MAX_SEGMENTS:
+        # Compaction: one segment (and one sorted hash array) for all history
+        name = f"segment-{next_segment:06d}"
+        next_segment += 1
+        write_arrow_ipc(cleaned_df, os.path.join(state_dir, f"{name}.arrow"))
+        np.save(os.path.join(state_dir, f"{name}.hashes.npy"), np.sort(_row_hashes(cleaned_df)))
+        for old in segments:
+            os.remove(os.path.join(state_dir, f"{old}.arrow"))
+            os.remove(os.path.join(state_dir, f"{old}.hashes.npy"))
+        segments = [name]
+
+    state = {key: pending[key] for key in ("header_hash", "offset", "tail_digest", "n_rows", "stats")}
+    state.update(segments=segments, next_segment=next_segment)
+    tmp_path = os.path.join(state_dir, f"state.pkl.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f)
+    os.replace(tmp_path, os.path.join(state_dir, "state.pkl"))
+
+    print(f"--- [TOOL:Incremental] Cleaned {len(cleaned_new)} new row(s); "
+          f"{len(cleaned_df)} cleaned row(s) in total ---")
+    return cleaned_df, new_rows_start
@@ -1,76 +1,344 @@
 import json
 import os
+import re
+import sqlite3
+import threading
 import time
+import zlib
 
-MEMORY_FILE = os.path.join("reports", "memory_bank.json")
-MAX_INSIGHTS = 10  # Limit the size of the memory bank
+import numpy as np
 
+# Insights are appended to an SQLite database in WAL mode: each write is a
+# single-row insert (no rewrite of the whole bank), concurrent pipeline runs
+# are serialised by SQLite's file locking, and reads use indexes on source
+# and date.
+#
+# The bank is partitioned into namespaces (normally a dataset's schema
+# fingerprint). Each namespace is its own database file under MEMORY_DIR, so
+# a lookup only opens the relevant shard and retention/compaction in one
+# namespace never evicts another's history. Insights written without a
+# namespace go to the shared MEMORY_FILE.
+MEMORY_FILE = os.path.join("reports", "memory_bank.sqlite")
+MEMORY_DIR = os.path.join("reports", "memory")
+LEGACY_MEMORY_FILE = os.path.join("reports", "memory_bank.json")  # Imported once, on first use
+_NAMESPACE_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
 
-def read_memory_bank() -> list[dict]:
+MAX_INSIGHTS = 10  # Past insights returned by default (bounds the LLM prompt)
+MAX_RETAINED_INSIGHTS = 5000  # Compaction keeps this many of the newest insights
+COMPACT_EVERY = 500  # Compact after every N appended insights
+
+# Retrieval: every insight is stored with a hashed term-frequency vector
+# (computed once, at write time). IDF weights are derived from the stored
+# vectors when querying, so nothing has to be rebuilt after a write.
+HASH_DIM = 2 ** 16
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9_]+")
+_STOPWORDS = frozenset(
+    "the and for with that this are was were from have has its into than then "
+    "their there these those which while also more most less not but all any "
+    "can may per each other such data insight".split()
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS insights (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    source TEXT NOT NULL,
+    insight TEXT NOT NULL,
+    data_key TEXT,
+    terms BLOB
+);
+CREATE INDEX IF NOT EXISTS insights_source_date ON insights (source, date);
+CREATE INDEX IF NOT EXISTS insights_date ON insights (date);
+CREATE INDEX IF NOT EXISTS insights_data_key ON insights (data_key, source);
+"""
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def _tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def term_vector(text: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed term-frequency vector of `text` as (sorted bucket ids, weights),
+    with sublinear weights 1 + log(count). crc32 keeps the hashing stable
+    across processes, unlike Python's salted hash().
+    """
+    buckets = np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) % HASH_DIM for token in _tokenize(text)),
+        dtype=np.uint32)
+    buckets, counts = np.unique(buckets, return_counts=True)
+    return buckets, (1.0 + np.log(counts)).astype(np.float32)
+
+
+def _encode_terms(text: str) -> bytes:
+    buckets, weights = term_vector(text)
+    return buckets.astype("<u4").tobytes() + weights.astype("<f4").tobytes()
+
+
+def _decode_terms(blob: bytes) -> tuple[np.ndarray, np.ndarray]:
+    half = len(blob) // 2
+    return np.frombuffer(blob[:half], dtype="<u4"), np.frombuffer(blob[half:], dtype="<f4")
+
+
+def _backfill_terms(conn: sqlite3.Connection):
+    """Adds term vectors to stores (or rows) written before retrieval existed."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(insights)")}
+    if "terms" not in columns:
+        conn.execute("ALTER TABLE insights ADD COLUMN terms BLOB")
+    rows = conn.execute("SELECT id, insight FROM insights WHERE terms IS NULL").fetchall()
+    conn.executemany("UPDATE insights SET terms = ? WHERE id = ?",
+                     [(_encode_terms(text), row_id) for row_id, text in rows])
+
+
+def _import_legacy_memory(conn: sqlite3.Connection):
+    """Copies the records of the old memory_bank.json into an empty store."""
+    if not os.path.exists(LEGACY_MEMORY_FILE):
+        return
+    if conn.execute("SELECT 1 FROM insights LIMIT 1").fetchone():
+        return
+    try:
+        with open(LEGACY_MEMORY_FILE, 'r', encoding='utf-8') as f:
+            records = json.load(f).get('past_insights', [])
+    except Exception as e:
+        print(f"Memory Tool Warning: Could not import {LEGACY_MEMORY_FILE}: {e}")
+        return
+
+    rows = [
+        (r.get("date") or "", r["source"], r["insight"], r.get("data_key"), _encode_terms(r["insight"]))
+        for r in records if r.get("insight") and r.get("source")
+    ]
+    conn.executemany(
+        "INSERT INTO insights (date, source, insight, data_key, terms) VALUES (?, ?, ?, ?, ?)", rows)
+    print(f"--- [TOOL:Memory] Imported {len(rows)} insight(s) from {LEGACY_MEMORY_FILE} ---")
+
+
+def memory_path(namespace: str = None) -> str:
+    """Database file holding `namespace` (the shared bank if None)."""
+    if namespace is None:
+        return MEMORY_FILE
+    if not _NAMESPACE_RE.match(namespace):
+        raise ValueError(f"Invalid memory namespace '{namespace}'.")
+    return os.path.join(MEMORY_DIR, f"{namespace}.sqlite")
+
+
+def _connect(namespace: str = None) -> sqlite3.Connection:
+    """Opens a memory shard, creating it (and importing the legacy JSON bank) if needed."""
+    path = memory_path(namespace)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                # IMMEDIATE takes the write lock, so two runs cannot both import
+                conn.execute("BEGIN IMMEDIATE")
+                _backfill_terms(conn)
+                if namespace is None:
+                    _import_legacy_memory(conn)
+                conn.commit()
+                _initialized.add(path)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _to_record(row) -> dict:
+    record = {"date": row[0], "source": row[1], "insight": row[2]}
+    if row[3] is not None:
+        record["data_key"] = row[3]
+    return record
+
+
+def read_memory_bank(limit: int = MAX_INSIGHTS, source: str = None, since: str = None,
+                     namespace: str = None) -> list[dict]:
     """
-    Reads the list of past insights from the memory bank JSON file.
+    Reads the most recent past insights from the memory bank.
+
+    Args:
+        limit: Maximum number of insights to return (None for all).
+        source: Only return insights written by this agent.
+        since: Only return insights dated at or after this 'YYYY-MM-DD[ HH:MM:SS]' string.
+        namespace: Memory namespace to read (the shared bank if None).
 
     Returns:
-        A list of insight dictionaries, or an empty list on failure.
+        A list of insight dictionaries, oldest first, or an empty list on failure.
     """
-    print(f"--- [TOOL:Memory] Reading {MEMORY_FILE} ---")
-    if not os.path.exists(MEMORY_FILE):
-        return []
+    print(f"--- [TOOL:Memory] Reading {memory_path(namespace)} ---")
+
+    clauses, params = [], []
+    if source is not None:
+        clauses.append("source = ?")
+        params.append(source)
+    if since is not None:
+        clauses.append("date >= ?")
+        params.append(since)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
 
     try:
-        with open(MEMORY_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # Ensure the loaded structure is a list under 'past_insights'
-            return data.get('past_insights', [])
-    except Exception as e:
+        conn = _connect(namespace)
+        try:
+            rows = conn.execute(
+                f"SELECT date, source, insight, data_key FROM insights {where} "
+                "ORDER BY date DESC, id DESC LIMIT ?",
+                params + [-1 if limit is None else limit]
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
         print(f"Memory Tool Error: Could not read memory bank: {e}")
-        # Re-initialize the file if it's corrupted
-        initialize_memory_bank()
         return []
 
+    return [_to_record(row) for row in reversed(rows)]
+
 
-def write_insight_to_memory(insight: str, source: str, date: str = None):
+def write_insight_to_memory(insight: str, source: str, date: str = None, data_key: str = None,
+                            namespace: str = None):
     """
-    Adds a new insight to the memory bank and maintains the maximum size.
+    Appends a new insight to the memory bank.
 
     Args:
         insight: The text of the new finding.
         source: The agent that generated the insight (e.g., 'InternalInsightsAgent').
         date: The date/time of the insight (defaults to current time).
+        data_key: Optional identifier of the data the insight was drawn from.
+            An identical insight already recorded for the same data is not
+            written again.
+        namespace: Memory namespace to append to (the shared bank if None).
     """
     if not insight or not source:
         print("Memory Tool Warning: Insight or source cannot be empty.")
         return
 
-    past_insights = read_memory_bank()
+    date = date if date else time.strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        conn = _connect(namespace)
+        try:
+            with conn:
+                # The duplicate check and the append are one statement, so
+                # concurrent writers cannot both insert the same insight
+                cursor = conn.execute(
+                    "INSERT INTO insights (date, source, insight, data_key, terms) "
+                    "SELECT ?, ?, ?, ?, ? WHERE ? IS NULL OR NOT EXISTS ("
+                    "SELECT 1 FROM insights WHERE data_key = ? AND source = ? AND insight = ?)",
+                    (date, source, insight, data_key, _encode_terms(insight),
+                     data_key, data_key, source, insight)
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Memory Tool Error: Could not write memory bank: {e}")
+        return
+
+    if cursor.rowcount == 0:
+        print("--- [TOOL:Memory] Insight already recorded for this data; skipping ---")
+        return
+    print(f"--- [TOOL:Memory] New insight written to {memory_path(namespace)} ---")
+
+    if cursor.lastrowid % COMPACT_EVERY == 0:
+        compact_memory_bank(namespace=namespace)
+
 
-    new_record = {
-        "date": date if date else time.strftime("%Y-%m-%d %H:%M:%S"),
-        "source": source,
-        "insight": insight
-    }
+def retrieve_relevant_insights(query: str, k: int = MAX_INSIGHTS, exclude_data_key: str = None,
+                               namespace: str = None) -> list[dict]:
+    """
+    Returns the `k` past insights most similar to `query` (e.g. a summary of
+    the current dataset's schema and statistics), most relevant first.
 
-    # Add new record and enforce max size (oldest records are dropped)
-    past_insights.append(new_record)
-    # Keep only the last MAX_INSIGHTS
-    past_insights = past_insights[-MAX_INSIGHTS:]
+    Similarity is the cosine between TF-IDF weighted hashed term vectors.
+    Insights sharing no terms with the query are never returned, and those
+    recorded for `exclude_data_key` are left out. Only the `namespace`
+    shard is searched.
 
+    Returns:
+        A list of insight dictionaries with an added 'score', or an empty list on failure.
+    """
+    print(f"--- [TOOL:Memory] Retrieving relevant insights from {memory_path(namespace)} ---")
     try:
-        data = {"past_insights": past_insights}
-        with open(MEMORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
-        print(f"--- [TOOL:Memory] New insight written to {MEMORY_FILE} ---")
-    except Exception as e:
-        print(f"Memory Tool Error: Could not write memory bank: {e}")
+        conn = _connect(namespace)
+        try:
+            rows = conn.execute(
+                "SELECT date, source, insight, data_key, terms FROM insights "
+                "WHERE terms IS NOT NULL AND (? IS NULL OR data_key IS NULL OR data_key != ?) ORDER BY id",
+                (exclude_data_key, exclude_data_key)
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Memory Tool Error: Could not read memory bank: {e}")
+        return []
 
+    query_buckets, query_weights = term_vector(query)
+    if not rows or query_buckets.size == 0:
+        return []
 
-def initialize_memory_bank():
-    """Ensures the memory bank file exists and is correctly initialized."""
-    if not os.path.exists(MEMORY_FILE):
-        os.makedirs(os.path.dirname(MEMORY_FILE), exist_ok=True)
+    # Flatten all stored vectors into (document, bucket, weight) triplets
+    vectors = [_decode_terms(row[4]) for row in rows]
+    lengths = np.fromiter((b.size for b, _ in vectors), dtype=np.int64, count=len(vectors))
+    doc_ids = np.repeat(np.arange(len(rows)), lengths)
+    buckets = np.concatenate([b for b, _ in vectors]).astype(np.int64)
+    weights = np.concatenate([w for _, w in vectors]).astype(np.float64)
+
+    # Smoothed IDF over the stored documents; buckets are unique within a document
+    doc_freq = np.bincount(buckets, minlength=HASH_DIM)
+    idf = np.log((1 + len(rows)) / (1 + doc_freq)) + 1.0
+
+    query_vec = np.zeros(HASH_DIM)
+    query_vec[query_buckets] = query_weights * idf[query_buckets]
+
+    doc_weights = weights * idf[buckets]
+    dots = np.bincount(doc_ids, weights=doc_weights * query_vec[buckets], minlength=len(rows))
+    norms = np.sqrt(np.bincount(doc_ids, weights=doc_weights ** 2, minlength=len(rows)))
+    scores = dots / (np.maximum(norms, 1e-12) * np.linalg.norm(query_vec))
+
+    # Highest score first; equal scores prefer the most recent insight
+    order = np.lexsort((-np.arange(len(rows)), -scores))[:k]
+    results = []
+    for i in order:
+        if scores[i] <= 0:
+            break
+        record = _to_record(rows[i])
+        record["score"] = round(float(scores[i]), 4)
+        results.append(record)
+    return results
+
+
+def compact_memory_bank(max_records: int = MAX_RETAINED_INSIGHTS, namespace: str = None) -> int:
+    """
+    Drops exact duplicates and all but the newest `max_records` insights of
+    one namespace, then truncates its write-ahead log. Returns the number of
+    rows removed.
+    """
+    try:
+        conn = _connect(namespace)
         try:
-            with open(MEMORY_FILE, "w", encoding='utf-8') as f:
-                f.write('{"past_insights": []}')
-        except Exception as e:
-            print(
-                f"Memory Tool Error: Could not initialize memory bank file: {e}")
+            with conn:
+                removed = conn.execute(
+                    "DELETE FROM insights WHERE id NOT IN ("
+                    "SELECT MAX(id) FROM insights GROUP BY source, insight, IFNULL(data_key, ''))"
+                ).rowcount
+                removed += conn.execute(
+                    "DELETE FROM insights WHERE id NOT IN ("
+                    "SELECT id FROM insights ORDER BY date DESC, id DESC LIMIT ?)",
+                    (max_records,)
+                ).rowcount
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Memory Tool Error: Could not compact memory bank: {e}")
+        return 0
+
+    print(f"--- [TOOL:Memory] Compacted {memory_path(namespace)} ({removed} record(s) removed) ---")
+    return removed
+
+
+def initialize_memory_bank():
+    """Ensures the memory bank store exists and is correctly initialized."""
+    try:
+        _connect().close()
+    except sqlite3.Error as e:
+        print(f"Memory Tool Error: Could not initialize memory bank: {e}")
@@ -1,46 +1,111 @@
 import pandas as pd
 import numpy as np
 import os
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import IsolationForest
-from statsmodels.tsa.arima.model import ARIMA
+import hashlib
+import json
+import math
+import multiprocessing
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# sklearn and statsmodels take about a second to import, so each model
+# function imports what it needs when it is first called.
 
 # Define the output directory based on the new structure
 ML_REPORT_DIR = "reports/ml"
 
-def prepare_time_series_data(df: pd.DataFrame) -> pd.DataFrame:
+def _to_datetime(values: pd.Series) -> pd.Series:
+    """pd.to_datetime that also handles categorical columns (as made by the dtype optimizer)."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.to_datetime(values, errors='coerce')
+    # Parse each distinct category once, then expand by the codes (-1 = missing)
+    categories = pd.to_datetime(values.cat.categories, errors='coerce').to_numpy()
+    codes = values.cat.codes.to_numpy()
+    dates = categories[codes] if len(categories) else np.full(len(codes), np.datetime64('NaT'))
+    dates[codes < 0] = np.datetime64('NaT')
+    return pd.Series(dates, index=values.index, name=values.name)
+
+
+def _find_time_series_columns(df: pd.DataFrame, roles: dict = None):
     """
-    Attempts to prepare data for time series analysis (e.g., sales forecasting).
-    Assumes the cleaned DataFrame has 'TotalSale' and a suitable date column.
+    Returns (date column, sales column) for time series analysis, or (None, None).
+    `roles` (from analyze_schema) supplies both without looking at the frame.
     """
-    df_ts = df.copy()
-    
+    if roles is not None:
+        date_col, sales_col = roles.get("date"), roles.get("target")
+        if date_col not in df.columns:
+            print("ML Tool Error: No suitable date column found for time series analysis.")
+            return None, None
+        if sales_col not in df.columns:
+            print("ML Tool Error: No numeric sales data available.")
+            return None, None
+        return date_col, sales_col
+
     # 1. Find Date Column (Assume cleaner has ensured a 'Date' column exists if possible)
-    date_col = next((col for col in df_ts.columns if 'date' in col.lower()), None)
+    date_col = next((col for col in df.columns if 'date' in col.lower()), None)
     
     if date_col is None:
         print("ML Tool Error: No suitable date column found for time series analysis.")
-        return None
+        return None, None
         
-    df_ts[date_col] = pd.to_datetime(df_ts[date_col], errors='coerce')
-    df_ts.dropna(subset=[date_col], inplace=True)
-    
     # 2. Find Sales Column (Assume cleaner/viz agent added 'TotalSale' or use the largest numeric)
-    sales_col = next((col for col in df_ts.columns if 'totalsale' in col.lower()), None)
+    sales_col = next((col for col in df.columns if 'totalsale' in col.lower()), None)
     if sales_col is None:
-        numeric_cols = df_ts.select_dtypes(include=[np.float64, np.int64]).columns
+        numeric_cols = df.select_dtypes(include=[np.number]).columns.drop(date_col, errors='ignore')
         if len(numeric_cols) > 0:
             sales_col = numeric_cols[0]
         else:
             print("ML Tool Error: No numeric sales data available.")
-            return None
+            return None, None
+
+    return date_col, sales_col
+
+
+def _daily_sales(df: pd.DataFrame, date_col: str, sales_col: str) -> pd.DataFrame:
+    df_ts = df[[date_col, sales_col]].copy()
+    df_ts[date_col] = _to_datetime(df_ts[date_col])
+    df_ts.dropna(subset=[date_col], inplace=True)
 
     # 3. Aggregate daily sales for forecasting
     df_ts = df_ts.set_index(date_col).resample('D').agg({sales_col: 'sum'}).fillna(0)
     df_ts.rename(columns={sales_col: 'DailySales'}, inplace=True)
     return df_ts
 
+
+def prepare_time_series_data(df: pd.DataFrame, fingerprint: str = None, new_rows_start: int = None,
+                             roles: dict = None) -> pd.DataFrame:
+    """
+    Attempts to prepare data for time series analysis (e.g., sales forecasting).
+    Assumes the cleaned DataFrame has 'TotalSale' and a suitable date column.
+
+    In incremental runs (`new_rows_start` given, rows before it unchanged since
+    the previous run) the daily aggregates persisted for `fingerprint` are
+    updated with the new rows only, provided they were built from those same
+    earlier rows (another file with the same schema has its own digest).
+    """
+    date_col, sales_col = _find_time_series_columns(df, roles)
+    if date_col is None:
+        return None
+
+    if fingerprint is None or new_rows_start is None:
+        return _daily_sales(df, date_col, sales_col)
+
+    params = {"date_col": date_col, "sales_col": sales_col}
+    state = load_model("daily_sales", fingerprint, params)
+    if state is not None and state["n_rows"] == new_rows_start <= len(df) and \
+            _rows_digest(df.iloc[:new_rows_start], [date_col, sales_col]) == state["rows_digest"]:
+        df_ts = state["daily"]
+        if len(df) > new_rows_start:
+            df_new = _daily_sales(df.iloc[new_rows_start:], date_col, sales_col)
+            df_ts = df_ts.add(df_new, fill_value=0).asfreq('D', fill_value=0)
+        print(f"--- [TOOL:ML] Updated daily aggregates with {len(df) - new_rows_start} new row(s) ---")
+    else:
+        df_ts = _daily_sales(df, date_col, sales_col)
+
+    save_model("daily_sales", fingerprint, params, {
+        "n_rows": len(df), "daily": df_ts, "rows_digest": _rows_digest(df, [date_col, sales_col])})
+    return df_ts
+
 def predict_sales_forecast(df_ts: pd.DataFrame, steps: int = 7) -> str:
     """
     Uses ARIMA model to predict future daily sales.
@@ -48,14 +113,10 @@ def predict_sales_forecast(df_ts: pd.DataFrame, steps: int = 7) -> str:
     if df_ts is None or df_ts.empty:
         return "N/A: Time series data preparation failed."
         
-    # Simple ARIMA (p, d, q) model for demonstration
-    # p=1 (lagged values), d=1 (differencing), q=0 (moving average)
     try:
-        model = ARIMA(df_ts['DailySales'], order=(1, 1, 0))
-        model_fit = model.fit()
-        
-        # Forecast 'steps' days into the future
-        forecast = model_fit.forecast(steps=steps)
+        # Simple ARIMA (p, d, q) model for demonstration
+        # p=1 (lagged values), d=1 (differencing), q=0 (moving average)
+        forecast = forecast_series(df_ts['DailySales'], steps, order=(1, 1, 0))
         
         # Create a DataFrame for the forecast report
         forecast_df = pd.DataFrame({
@@ -72,71 +133,521 @@ def predict_sales_forecast(df_ts: pd.DataFrame, steps: int = 7) -> str:
         return f"N/A: Forecasting failed. {e}"
 
 
-def detect_anomalies(df: pd.DataFrame, contamination_rate: float = 0.1) -> str:
+# ======================================================
+# Forecasting backends
+# ======================================================
+# ARIMA(p, d, 0) is an AR(p) model on the d-th differences. Its conditional
+# least-squares fit is one linear solve, so low orders are estimated with
+# NumPy in milliseconds instead of by statsmodels' iterative MLE. ARIMA(0, 1, 1)
+# is simple exponential smoothing. Other orders, series too short for a
+# stable fit, and non-stationary AR estimates (which statsmodels would
+# constrain) go to statsmodels.
+FAST_FORECAST_MAX_P = 3
+FAST_FORECAST_MAX_D = 2
+SES_ALPHA_GRID = np.linspace(0.01, 1.0, 100)
+
+
+def _forecast_index(index: pd.Index, steps: int) -> pd.Index:
+    """Index of the `steps` periods following `index`, as statsmodels labels a forecast."""
+    if isinstance(index, pd.DatetimeIndex) and len(index) > 0:
+        freq = index.freq or (pd.infer_freq(index) if len(index) >= 3 else None) or 'D'
+        return pd.date_range(index[-1], periods=steps + 1, freq=freq)[1:]
+    return pd.RangeIndex(len(index), len(index) + steps)
+
+
+def _ar_on_differences(y: np.ndarray, p: int, d: int, steps: int) -> np.ndarray:
+    """Closed-form ARIMA(p, d, 0) forecast (constant term only when d == 0, like statsmodels)."""
+    levels = [y]
+    for _ in range(d):
+        levels.append(np.diff(levels[-1]))
+    z = levels[-1]
+
+    use_const = d == 0
+    n_obs = len(z) - p
+    if n_obs < p + use_const + 2:
+        raise ValueError("series too short for a closed-form fit")
+
+    # Lagged design matrix: column k holds z[t - k - 1]
+    columns = [z[p - k - 1:len(z) - k - 1] for k in range(p)]
+    if use_const:
+        columns.append(np.ones(n_obs))
+    target = z[p:]
+    if columns:
+        coefs = np.linalg.lstsq(np.column_stack(columns), target, rcond=None)[0]
+    else:
+        coefs = np.zeros(0)
+    phi = coefs[:p]
+    const = coefs[p] if use_const else 0.0
+
+    if p and np.any(np.abs(np.roots(np.r_[1.0, -phi])) >= 1.0):
+        raise ValueError("non-stationary AR estimate")
+
+    # Recursive forecast of the differenced series
+    history = list(z[len(z) - p:]) if p else []
+    z_hat = np.empty(steps)
+    for h in range(steps):
+        z_hat[h] = const + sum(phi[k] * history[-k - 1] for k in range(p))
+        history.append(z_hat[h])
+
+    # Undo the differencing, from the highest level down
+    forecast = z_hat
+    for level in reversed(levels[:-1]):
+        forecast = level[-1] + np.cumsum(forecast)
+    return forecast
+
+
+def _simple_exponential_smoothing(y: np.ndarray, steps: int) -> np.ndarray:
+    """SES with the smoothing weight picked from SES_ALPHA_GRID by one-step-ahead SSE."""
+    if len(y) < 3:
+        raise ValueError("series too short for exponential smoothing")
+    alphas = SES_ALPHA_GRID
+    level = np.full(len(alphas), y[0], dtype=np.float64)
+    sse = np.zeros(len(alphas))
+    # All candidate weights are filtered together: one vector update per time step
+    for value in y[1:]:
+        error = value - level
+        sse += error * error
+        level += alphas * error
+    return np.full(steps, level[np.argmin(sse)])
+
+
+def _statsmodels_forecast(series: pd.Series, steps: int, order: tuple) -> pd.Series:
+    from statsmodels.tsa.arima.model import ARIMA
+
+    model = ARIMA(series, order=order)
+    model_fit = model.fit()
+
+    # Forecast 'steps' days into the future
+    return model_fit.forecast(steps=steps)
+
+
+def _fast_forecast(series: pd.Series, steps: int, order: tuple) -> pd.Series:
+    """NumPy forecast for orders with a closed-form fit; raises ValueError otherwise."""
+    p, d, q = order
+    y = series.to_numpy(dtype=np.float64)
+    if q == 0 and p <= FAST_FORECAST_MAX_P and d <= FAST_FORECAST_MAX_D:
+        values = _ar_on_differences(y, p, d, steps)
+    elif order == (0, 1, 1):
+        values = _simple_exponential_smoothing(y, steps)
+    else:
+        raise ValueError(f"no closed-form fit for order {order}")
+    return pd.Series(values, index=_forecast_index(series.index, steps), name='predicted_mean')
+
+
+def forecast_series(series: pd.Series, steps: int, order: tuple = (1, 1, 0), backend: str = "auto") -> pd.Series:
     """
-    Uses Isolation Forest to detect outlier transactions based on sales amount.
+    Forecasts `steps` periods of `series` with an ARIMA `order` model.
+
+    backend='auto' uses the closed-form NumPy fit when the order allows it and
+    statsmodels otherwise; 'numpy' and 'statsmodels' force one or the other.
     """
-    df_anomaly = df.copy()
-    
-    # Use sales amount for anomaly detection
-    sales_col = next((col for col in df_anomaly.columns if 'totalsale' in col.lower()), None)
-    if sales_col is None:
-        return "N/A: Sales column not found for anomaly detection."
+    if backend == "statsmodels":
+        return _statsmodels_forecast(series, steps, order)
+    try:
+        return _fast_forecast(series, steps, order)
+    except ValueError:
+        if backend == "numpy":
+            raise
+        return _statsmodels_forecast(series, steps, order)
+
+
+def compare_forecast_backends(series: pd.Series, steps: int = 7, order: tuple = (1, 1, 0)) -> dict:
+    """
+    Fits `series` with both backends and reports how far the closed-form
+    forecast is from the statsmodels one, plus each backend's run time.
+    """
+    import time
+
+    start = time.perf_counter()
+    fast = forecast_series(series, steps, order, backend="numpy")
+    fast_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        reference = forecast_series(series, steps, order, backend="statsmodels")
+    statsmodels_seconds = time.perf_counter() - start
+
+    delta = np.abs(fast.to_numpy() - reference.to_numpy())
+    scale = np.maximum(np.abs(reference.to_numpy()), 1e-12)
+    return {
+        "order": order,
+        "max_abs_delta": float(delta.max()),
+        "mean_abs_delta": float(delta.mean()),
+        "max_rel_delta": float((delta / scale).max()),
+        "numpy_seconds": round(fast_seconds, 5),
+        "statsmodels_seconds": round(statsmodels_seconds, 5),
+    }
+
+
+# ======================================================
+# Multi-series forecasting
+# ======================================================
+# Closed-form fits take ~1 ms, so a pool only pays off for many series
+FORECAST_MIN_PARALLEL_SERIES = 1000  # Fewer series are fitted in-process
+FORECAST_BATCHES_PER_WORKER = 4    # Batches per worker: balances load vs. pool overhead
+
+
+def _forecast_batch(batch: list, steps: int) -> list:
+    """
+    Worker entry point: forecasts every (key, series) pair in `batch`. A
+    failing series yields an error message instead of failing the batch.
+    """
+    results = []
+    with warnings.catch_warnings():
+        # Convergence/frequency warnings from hundreds of fits drown the log
+        warnings.simplefilter("ignore")
+        for key, series in batch:
+            try:
+                results.append((key, forecast_series(series, steps), None))
+            except Exception as e:
+                results.append((key, None, str(e)))
+    return results
+
+
+def _daily_series_by_group(df: pd.DataFrame, group_col: str, date_col: str, sales_col: str) -> list:
+    """Daily sales per group as [(group, series)], each resampled over its own date range."""
+    dates = _to_datetime(df[date_col])
+    valid = dates.notna() & df[group_col].notna()
+    daily = (
+        df.loc[valid, sales_col]
+        .groupby([df.loc[valid, group_col], dates[valid].dt.floor('D')], observed=True, sort=False)
+        .sum()
+    )
+    series = []
+    for key, group in daily.groupby(level=0, observed=True, sort=False):
+        group = group.droplevel(0).sort_index()
+        series.append((key, group.asfreq('D', fill_value=0).rename('DailySales')))
+    return series
+
+
+def forecast_by_group(df: pd.DataFrame, group_col: str, steps: int = 7, max_workers: int = None,
+                      batch_size: int = None, progress_callback=None, roles: dict = None) -> str:
+    """
+    Forecasts daily sales separately for every value of `group_col` (e.g. each
+    category or region) with the same ARIMA(1, 1, 0) model as
+    predict_sales_forecast, and writes one combined forecast table.
+
+    Large numbers of series are fitted across a process pool. A single fit
+    takes milliseconds, so series are sent to workers in batches so that
+    process startup and pickling do not dominate. A series that fails to fit is reported and
+    skipped without affecting the others.
+
+    Args:
+        group_col: Column whose values define the series.
+        steps: Days to forecast for each series.
+        max_workers: Worker processes (defaults to the CPU count).
+        batch_size: Series per task (defaults to a few batches per worker).
+        progress_callback: Called as progress_callback(done, total) after each
+            batch, with counts of series.
+        roles: Column roles from analyze_schema (date and sales columns).
+    """
+    if group_col not in df.columns:
+        return f"N/A: Group column '{group_col}' not found for forecasting."
+
+    date_col, sales_col = _find_time_series_columns(df, roles)
+    if date_col is None:
+        return "N/A: Time series data preparation failed."
+
+    series = _daily_series_by_group(df, group_col, date_col, sales_col)
+    if not series:
+        return "N/A: No dated rows available for forecasting."
+
+    total = len(series)
+    max_workers = max_workers or os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(1, math.ceil(total / (max_workers * FORECAST_BATCHES_PER_WORKER)))
+    batches = [series[i:i + batch_size] for i in range(0, total, batch_size)]
+
+    print(f"--- [TOOL:ML] Forecasting {total} series by '{group_col}' "
+          f"({len(batches)} batch(es)) ---")
+
+    results = []
+
+    def collect(batch_results):
+        results.extend(batch_results)
+        if progress_callback is not None:
+            progress_callback(len(results), total)
+
+    if total < FORECAST_MIN_PARALLEL_SERIES or max_workers == 1 or len(batches) == 1:
+        for batch in batches:
+            collect(_forecast_batch(batch, steps))
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(batches)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(_forecast_batch, batch, steps): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    collect(future.result())
+                except Exception as e:
+                    # e.g. the worker process died: only this batch's series fail
+                    collect([(key, None, str(e)) for key, _ in futures[future]])
+
+    # Input order of the groups, regardless of which batch finished first
+    order = {key: i for i, (key, _) in enumerate(series)}
+    results.sort(key=lambda result: order[result[0]])
+
+    frames, failures = [], []
+    for key, forecast, error in results:
+        if error is not None:
+            failures.append((key, error))
+            continue
+        frames.append(pd.DataFrame({
+            group_col: key,
+            'Date': pd.to_datetime(forecast.index).strftime('%Y-%m-%d'),
+            'Forecasted_Sales': np.round(forecast.values, 2)
+        }))
+
+    if failures:
+        print(f"ML Tool Warning: {len(failures)} of {total} '{group_col}' series could not be forecast "
+              f"(e.g. {failures[0][0]}: {failures[0][1]})")
+    if not frames:
+        return f"N/A: Forecasting failed for every '{group_col}' series."
+
+    forecast_df = pd.concat(frames, ignore_index=True)
+
+    output_path = os.path.join(ML_REPORT_DIR, f"sales_forecast_by_{group_col}.csv")
+    forecast_df.to_csv(output_path, index=False)
+    return output_path
+
+
+# ======================================================
+# Model persistence
+# ======================================================
+MODEL_DIR = os.path.join(ML_REPORT_DIR, "models")
+ANOMALY_REFIT_GROWTH = 1.0  # Refit once the data has grown by this fraction since the last fit
+ANOMALY_FIT_MAX_ROWS = 200_000  # Larger inputs are fitted on a row subsample of this size
+ANOMALY_SCORE_BATCH_ROWS = 100_000  # Rows scored per batch (bounds scoring memory)
+
+
+def _model_path(kind: str, fingerprint: str, params: dict) -> str:
+    """Artifact path for a model of `kind` fitted on a dataset with the given parameters."""
+    params_key = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(MODEL_DIR, f"{kind}_{fingerprint}_{params_key}.joblib")
+
+
+def load_model(kind: str, fingerprint: str, params: dict):
+    """Returns the persisted model state, or None if there is none (or it cannot be read)."""
+    path = _model_path(kind, fingerprint, params)
+    if not os.path.exists(path):
+        return None
+    try:
+        import joblib
+
+        return joblib.load(path)
+    except Exception as e:
+        print(f"ML Tool Warning: Ignoring unreadable model {path}: {e}")
+        return None
+
+
+def save_model(kind: str, fingerprint: str, params: dict, state) -> str:
+    """Persists a model state under MODEL_DIR (atomically) and returns its path."""
+    import joblib
+
+    path = _model_path(kind, fingerprint, params)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(state, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _features_digest(X: np.ndarray) -> str:
+    # Hashing runs at memory speed (~1 GB/s), far below the cost of a refit
+    return hashlib.blake2b(memoryview(np.ascontiguousarray(X)), digest_size=16).hexdigest()
+
+
+def _rows_digest(df: pd.DataFrame, columns: list) -> str:
+    """Digest of the values in `columns` (row hashes, so categorical and object columns agree)."""
+    return _features_digest(pd.util.hash_pandas_object(df[columns], index=False).to_numpy())
+
+
+def _reusable_anomaly_state(state, X: np.ndarray):
+    """
+    The persisted state if it can score just the rows appended since it was
+    last used: those earlier rows are unchanged and the data has not grown by
+    more than ANOMALY_REFIT_GROWTH since the model was fitted.
+    """
+    if state is None or "fit_rows" not in state:
+        return None
+    n_old = state["n_rows"]
+    if not n_old <= len(X) <= state["fit_rows"] * (1 + ANOMALY_REFIT_GROWTH):
+        return None
+    if _features_digest(X[:n_old]) != state["features_digest"]:
+        return None
+    return state
+
+
+def _anomaly_features(df: pd.DataFrame, features: list) -> np.ndarray:
+    """Float feature matrix for the anomaly model; missing values take the column mean."""
+    X = df[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(X)
+    if missing.any():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            col_means = np.nan_to_num(np.nanmean(X, axis=0))
+        X[missing] = np.take(col_means, np.nonzero(missing)[1])
+    return X
+
+
+def fit_anomaly_model(X: np.ndarray, contamination_rate: float = 0.1, random_state: int = 42):
+    """
+    Fits an Isolation Forest on all cores. Inputs above ANOMALY_FIT_MAX_ROWS
+    are fitted on a uniform row subsample: every tree only sees 256 rows
+    anyway, so the subsample mostly sets how precisely the contamination
+    threshold is placed.
+    """
+    from sklearn.ensemble import IsolationForest
+
+    if len(X) > ANOMALY_FIT_MAX_ROWS:
+        rng = np.random.default_rng(random_state)
+        X = X[np.sort(rng.choice(len(X), ANOMALY_FIT_MAX_ROWS, replace=False))]
+    model = IsolationForest(contamination=contamination_rate, random_state=random_state, n_jobs=-1)
+    return model.fit(X)
+
+
+def score_batches(model, batches, features: list):
+    """
+    Streams anomaly scores for an iterable of DataFrames (e.g. from
+    load_data_chunks), so frames larger than memory can be scored.
+
+    Yields (row positions, scores) of the flagged rows of each batch, with
+    positions counted from the first row of the first batch. Scores are the
+    model's decision_function: negative for anomalies, lower is more anomalous.
+    """
+    offset = 0
+    for batch in batches:
+        scores = model.decision_function(_anomaly_features(batch, features)) if len(batch) else np.empty(0)
+        flagged = np.flatnonzero(scores < 0)
+        yield offset + flagged, scores[flagged]
+        offset += len(batch)
+
+
+def _frame_batches(df: pd.DataFrame, batch_rows: int = None):
+    batch_rows = batch_rows or ANOMALY_SCORE_BATCH_ROWS
+    for start in range(0, len(df), batch_rows):
+        yield df.iloc[start:start + batch_rows]
+
+
+def _collect_flags(model, df: pd.DataFrame, features: list) -> tuple[np.ndarray, np.ndarray]:
+    positions, scores = [np.empty(0, dtype=np.intp)], [np.empty(0)]
+    for batch_positions, batch_scores in score_batches(model, _frame_batches(df), features):
+        positions.append(batch_positions)
+        scores.append(batch_scores)
+    return np.concatenate(positions), np.concatenate(scores)
+
+
+def detect_anomalies(df: pd.DataFrame, contamination_rate: float = 0.1, fingerprint: str = None,
+                     roles: dict = None) -> str:
+    """
+    Uses Isolation Forest on all numeric columns to detect outlier transactions.
+    With `roles` (from analyze_schema) identifier columns are left out.
+
+    The model is fitted with fit_anomaly_model and rows are scored in batches
+    of ANOMALY_SCORE_BATCH_ROWS. Only the flagged rows are written: their
+    index label and score (see score_batches).
+
+    With a dataset `fingerprint` the fitted model is persisted under
+    MODEL_DIR. A later run on the same data plus appended rows reuses it and
+    scores only the new rows; the model is refit when earlier rows changed
+    or the data has grown by more than ANOMALY_REFIT_GROWTH since the fit.
+    """
+    if roles is not None:
+        features = [col for col in roles["numeric"] if col in df.columns]
+    else:
+        features = [col for col in df.select_dtypes(include=[np.number]).columns
+                    if not pd.api.types.is_bool_dtype(df[col])]
+    if not features:
+        return "N/A: No numeric columns found for anomaly detection."
+
+    X = _anomaly_features(df, features)
+
+    from sklearn import __version__ as sklearn_version
+
+    params = {"features": features, "contamination": contamination_rate, "random_state": 42,
+              "fit_max_rows": ANOMALY_FIT_MAX_ROWS, "sklearn": sklearn_version}
+    state = None
+    if fingerprint:
+        state = _reusable_anomaly_state(load_model("isolation_forest", fingerprint, params), X)
+
+    if state is not None:
+        # Score only the rows appended since the last run
+        model, fit_rows = state["model"], state["fit_rows"]
+        n_old = state["n_rows"]
+        new_positions, new_scores = _collect_flags(model, df.iloc[n_old:], features)
+        anomaly_positions = np.concatenate([state["anomaly_positions"], n_old + new_positions])
+        anomaly_scores = np.concatenate([state["anomaly_scores"], new_scores])
+        print(f"--- [TOOL:ML] Reused anomaly model; scored {len(X) - n_old} new row(s) ---")
+    else:
+        model, fit_rows = fit_anomaly_model(X, contamination_rate), len(X)
+        anomaly_positions, anomaly_scores = _collect_flags(model, df, features)
+
+    if fingerprint and len(X) and (state is None or len(X) > state["n_rows"]):
+        save_model("isolation_forest", fingerprint, params, {
+            "model": model,
+            "fit_rows": fit_rows,  # Rows the model was fitted on
+            "n_rows": len(X),  # Rows scored so far (anomaly_positions covers these)
+            "anomaly_positions": anomaly_positions,
+            "anomaly_scores": anomaly_scores,
+            "features_digest": _features_digest(X),
+        })
+
+    anomalies = pd.DataFrame({
+        "row_index": df.index[anomaly_positions],
+        "anomaly_score": anomaly_scores,
+    })
 
-    # Train the Isolation Forest model
-    X = df_anomaly[[sales_col]].values
-    
-    # Isolation Forest is effective for detecting outliers in data
-    model = IsolationForest(contamination=contamination_rate, random_state=42)
-    df_anomaly['Anomaly'] = model.fit_predict(X)
-    
-    # Filter for anomalies (where Anomaly == -1)
-    anomalies_df = df_anomaly[df_anomaly['Anomaly'] == -1].drop(columns=['Anomaly'])
-    
     output_path = os.path.join(ML_REPORT_DIR, "transaction_anomalies.csv")
-    anomalies_df.to_csv(output_path, index=False)
-    
+    anomalies.to_csv(output_path, index=False)
+
     return output_path
 
 
-def predict_demand_by_category(df: pd.DataFrame, category_col: str = 'Category') -> str:
+def predict_demand_by_category(df: pd.DataFrame, category_col: str = 'Category', quantity_col: str = None) -> str:
     """
     Predicts demand (quantity) for each product category using simple linear regression
-    based on the time index (a proxy for trend).
+    based on the time index (a proxy for trend). The caller's DataFrame is not modified.
     """
     if category_col not in df.columns:
         return f"N/A: Category column '{category_col}' not found for demand prediction."
         
     # Assume 'Quantity' or 'Units' is the demand metric
-    quantity_col = next((col for col in df.columns if 'quantity' in col.lower() or 'units' in col.lower()), None)
     if quantity_col is None:
+        quantity_col = next((col for col in df.columns if 'quantity' in col.lower() or 'units' in col.lower()), None)
+    if quantity_col is None or quantity_col not in df.columns:
         return "N/A: Quantity/Units column not found for demand prediction."
-        
-    results = []
-    
-    # 1. Create a time index (feature for linear regression)
-    df['TimeIndex'] = range(len(df))
-    
-    for category in df[category_col].unique():
-        category_df = df[df[category_col] == category].copy()
-        
-        # Aggregate quantity by time index (e.g., transaction order)
-        X = category_df[['TimeIndex']].values 
-        y = category_df[quantity_col].values
-        
-        # Simple Linear Regression to model the trend in demand
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        # Forecast the next period's demand (e.g., transaction N+1)
-        next_time_index = df['TimeIndex'].max() + 1
-        predicted_demand = model.predict([[next_time_index]])[0]
-        
-        results.append({
-            'Category': category,
-            'Trend_Coefficient': np.round(model.coef_[0], 4),
-            'Predicted_Next_Demand': np.round(predicted_demand, 2)
-        })
+
+    # Every category's least-squares line against the row position (the time
+    # index) in closed form from grouped sums, in a single pass over the data:
+    #   slope = sum(dx * dy) / sum(dx^2), intercept = mean(y) - slope * mean(x)
+    # Deviations are taken from each group's own mean (as LinearRegression
+    # does), which avoids the cancellation of the raw-moment formula.
+    codes, categories = pd.factorize(df[category_col], sort=False)
+    valid = codes >= 0
+    groups = codes[valid]
+    x = np.arange(len(df), dtype=np.float64)[valid]
+    y = df[quantity_col].to_numpy(dtype=np.float64)[valid]
+
+    counts = np.bincount(groups, minlength=len(categories))
+    x_mean = np.bincount(groups, weights=x, minlength=len(categories)) / counts
+    y_mean = np.bincount(groups, weights=y, minlength=len(categories)) / counts
+    dx = x - x_mean[groups]
+    sxx = np.bincount(groups, weights=dx * dx, minlength=len(categories))
+    sxy = np.bincount(groups, weights=dx * (y - y_mean[groups]), minlength=len(categories))
+
+    # A single-row category has no trend (LinearRegression also gives 0)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    intercept = y_mean - slope * x_mean
+
+    # Forecast the next period's demand (e.g., transaction N+1)
+    next_time_index = len(df)
+    predicted_demand = intercept + slope * next_time_index
+
+    results = {
+        'Category': list(categories),
+        'Trend_Coefficient': np.round(slope, 4),
+        'Predicted_Next_Demand': np.round(predicted_demand, 2)
+    }
 
     results_df = pd.DataFrame(results)
     output_path = os.path.join(ML_REPORT_DIR, "category_demand_predictions.csv")
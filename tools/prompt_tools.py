@@ -0,0 +1,151 @@
+import datetime
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+# Token counts are estimated offline (counting with the API would cost a
+# request per section): English prose and JSON average about four characters
+# per token for Gemini's tokenizer.
+CHARS_PER_TOKEN = 4
+MIN_SECTION_TOKENS = 50  # A section with less room than this is left out
+PROFILE_COLUMN_STEPS = (50, 20, 10, 5, 0)  # Per-column stats kept while summarising a profile
+TABLE_ROWS = 10  # Rows of each table (DataFrame) rendered into a prompt
+MAX_ITEMS = 100  # Elements of an array or Series rendered into a prompt
+
+
+class NumpyJSONEncoder(json.JSONEncoder):
+    """
+    JSON encoder for values prompt data may still hold: NumPy scalars and
+    arrays, pandas objects and timestamps. Anything else becomes its str().
+    """
+
+    def default(self, obj):
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return None if np.isnan(obj) else float(obj)
+        if isinstance(obj, np.bool_):
+            return bool(obj)
+        if isinstance(obj, (np.ndarray, pd.Series)):
+            return obj[:MAX_ITEMS].tolist()
+        if isinstance(obj, pd.DataFrame):
+            return obj.head(TABLE_ROWS).to_markdown(index=False)
+        if isinstance(obj, (datetime.date, datetime.datetime, pd.Timestamp)):
+            return obj.isoformat()
+        return str(obj)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def compact_json(obj) -> str:
+    """JSON without indentation or spaces after separators (about a third fewer tokens)."""
+    return json.dumps(obj, separators=(",", ":"), cls=NumpyJSONEncoder)
+
+
+def _render(content) -> str:
+    return content if isinstance(content, str) else compact_json(content)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    dropped = estimate_tokens(text) - max_tokens
+    marker = f" …[truncated ~{dropped} tokens]"
+    return text[:max(0, max_tokens * CHARS_PER_TOKEN - len(marker))] + marker
+
+
+def _round_floats(obj, digits: int = 4):
+    if isinstance(obj, float):
+        return float(f"{obj:.{digits}g}") if math.isfinite(obj) else obj
+    if isinstance(obj, dict):
+        return {k: _round_floats(v, digits) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_round_floats(v, digits) for v in obj]
+    return obj
+
+
+def summarize_profile(profile: dict, max_columns: int, priority_columns=()) -> dict:
+    """
+    Smaller version of a data profile: dataset-level facts, a dtype histogram,
+    and per-column stats for at most `max_columns` columns. Columns listed in
+    `priority_columns` come first, then columns with missing values. Floats
+    are rounded to 4 significant digits.
+    """
+    if not isinstance(profile, dict) or "columns" not in profile:
+        return profile
+    columns = list(profile["columns"])
+    dtypes = profile.get("data_types", {})
+    missing = profile.get("missing_values", {})
+    stats = profile.get("summary_stats", {})
+
+    ranked = [col for col in priority_columns if col in stats]
+    ranked += sorted((col for col in columns if col in stats and col not in ranked),
+                     key=lambda col: -(missing.get(col) or 0))
+    kept = ranked[:max_columns]
+
+    dtype_counts = {}
+    for col in columns:
+        dtype_counts[str(dtypes.get(col))] = dtype_counts.get(str(dtypes.get(col)), 0) + 1
+
+    summary = {
+        "shape": profile.get("shape"),
+        "dtype_counts": dtype_counts,
+        "total_missing": sum(v for v in missing.values() if v),
+        "columns_with_missing": {col: n for col, n in missing.items() if n}
+        if len(missing) <= max_columns else sum(1 for n in missing.values() if n),
+        "summary_stats": {col: stats[col] for col in kept},
+    }
+    if len(columns) > len(kept):
+        summary["omitted_columns"] = len(columns) - len(kept)
+    for key in ("profile_method", "memory_optimization"):
+        if key in profile:
+            summary[key] = profile[key]
+    return _round_floats(summary)
+
+
+def build_prompt(header: str, sections: list, budget_tokens: int, footer: str = "") -> tuple[str, dict]:
+    """
+    Assembles header, sections and footer into a prompt of at most about
+    `budget_tokens` tokens.
+
+    `sections` is a list of (name, content, max_share, summarizers) in order
+    of importance. Content is text or JSON-able data (rendered as compact
+    JSON). Each section may use at most `max_share` of the budget and what
+    the more important sections left. When it does not fit, the
+    `summarizers` (callables taking the content, from mild to aggressive)
+    are tried in turn, and the last rendering is truncated. Sections with
+    less than MIN_SECTION_TOKENS of room are left out.
+
+    Returns (prompt, {name: {"tokens", "original_tokens", "status"}}).
+    """
+    remaining = budget_tokens - estimate_tokens(header) - estimate_tokens(footer)
+    blocks, stats = [], {}
+
+    for name, content, max_share, summarizers in sections:
+        text = _render(content)
+        original_tokens = estimate_tokens(text)
+        allowance = min(remaining, int(budget_tokens * max_share))
+        status = "full"
+
+        if original_tokens > allowance:
+            for summarize in summarizers or ():
+                text = _render(summarize(content))
+                status = "summarized"
+                if estimate_tokens(text) <= allowance:
+                    break
+            if estimate_tokens(text) > allowance:
+                if allowance < MIN_SECTION_TOKENS:
+                    stats[name] = {"tokens": 0, "original_tokens": original_tokens, "status": "omitted"}
+                    continue
+                text = _truncate(text, allowance)
+                status = "truncated"
+
+        block = f"## {name}\n{text}\n"
+        tokens = estimate_tokens(block)
+        remaining -= tokens
+        blocks.append(block)
+        stats[name] = {"tokens": tokens, "original_tokens": original_tokens, "status": status}
+
+    return header + "\n".join(blocks) + footer, stats
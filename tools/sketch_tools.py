@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# HyperLogLog precision: 2**12 registers, ~1.6% standard error on distinct counts
+HLL_PRECISION = 12
+
+# Position of the leftmost 1-bit (1-based) for every 16-bit value; 17 for zero
+_RHO_16 = (16 - np.floor(np.log2(np.maximum(np.arange(1 << 16), 1)))).astype(np.uint8)
+_RHO_16[0] = 17
+
+
+def hash_values(values) -> np.ndarray:
+    """Returns stable 64-bit hashes for a Series/array, ignoring missing values."""
+    series = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.util.hash_array(series.dropna().to_numpy())
+
+    # Strings/categories: hash each distinct value once and broadcast by code
+    codes, uniques = pd.factorize(series)
+    unique_hashes = pd.util.hash_array(np.asarray(uniques, dtype=object))
+    return unique_hashes[codes[codes >= 0]]
+
+
+def _hll_update(registers: np.ndarray, hashes: np.ndarray, offsets, precision: int):
+    """Folds 64-bit hashes into flat register storage at the given row offsets."""
+    bucket = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+    remainder = hashes << np.uint64(precision)
+
+    # rho = position of the leftmost 1-bit in the remaining bits, looked up
+    # from the top 16 bits; the rare all-zero prefixes are resolved exactly
+    rho = _RHO_16[(remainder >> np.uint64(48)).astype(np.intp)]
+    deep = np.flatnonzero(rho == 17)
+    if deep.size:
+        _, exponent = np.frexp(remainder[deep].astype(np.float64))
+        rho[deep] = np.where(remainder[deep] == 0, 64, 65 - exponent)
+    rho = np.minimum(rho, 64 - precision + 1)
+
+    np.maximum.at(registers, bucket + offsets, rho)
+
+
+def hll_registers(values, precision: int = HLL_PRECISION) -> np.ndarray:
+    """
+    Builds HyperLogLog registers for the given values. Registers from
+    different chunks of the same column are combined with hll_merge.
+    """
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    hashes = hash_values(values)
+    if hashes.size:
+        _hll_update(registers, hashes, 0, precision)
+    return registers
+
+
+def hll_merge(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Merges two HyperLogLog register arrays of the same precision."""
+    return np.maximum(left, right)
+
+
+def hll_estimate(registers: np.ndarray) -> int:
+    """Estimates the number of distinct values from HyperLogLog registers."""
+    m = registers.size
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction (linear counting)
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+def estimate_distinct(frequencies: np.ndarray, population: int) -> int:
+    """
+    Estimates the distinct count of `population` values from the value
+    frequencies of a uniform sample of them (Chao1: the values seen once or
+    twice indicate how many were not seen). Exact for a complete sample.
+    """
+    seen = len(frequencies)
+    if int(np.sum(frequencies)) >= population:
+        return seen
+    f1 = int(np.count_nonzero(frequencies == 1))
+    f2 = int(np.count_nonzero(frequencies == 2))
+    unseen = f1 * f1 / (2 * f2) if f2 else f1 * (f1 - 1) / 2
+    return int(min(round(seen + unseen), population))
+
+
+def sample_values(values, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Uniform sample (without replacement) of at most `size` values."""
+    values = np.asarray(values)
+    if values.size <= size:
+        return values
+    return values[np.sort(rng.choice(values.size, size=size, replace=False))]
+
+
+def merge_samples(left: np.ndarray, n_left: int, right: np.ndarray, n_right: int,
+                  size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Combines uniform samples of two populations (of n_left and n_right items)
+    into a uniform sample of at most `size` items of their union.
+    """
+    if n_left + n_right == 0:
+        return left
+    k = min(size, len(left) + len(right))
+    # Items are drawn from each side in proportion to its population
+    k_left = int(rng.hypergeometric(n_left, n_right, k)) if n_left and n_right else (k if n_left else 0)
+    k_left = min(max(k_left, k - len(right)), len(left))
+    return np.concatenate([
+        sample_values(left, k_left, rng),
+        sample_values(right, k - k_left, rng),
+    ])
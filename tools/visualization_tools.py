@@ -1,15 +1,47 @@
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+import hashlib
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+try:
+    # Unix only; elsewhere the index is only locked within one process
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# matplotlib and seaborn are imported inside the plotting functions: they are
+# slow to import and only needed once a plot is actually drawn.
 
 # Define the output directory
 PLOT_DIR = "reports/plots"
+PLOT_MIN_PARALLEL_JOBS = 2  # Fewer plots are rendered in-process (see render_plots)
+PLOT_POOL_WORKERS = 3  # The pipeline renders at most three plots at once
+PLOT_POOL_MIN_ROWS = 100_000  # Smaller datasets render in-process (see start_plot_pool)
+PLOT_MAX_SCATTER_POINTS = 50_000  # Larger scatter plots become hexbin density plots
+PLOT_MAX_HEXBIN_POINTS = 1_000_000  # Rows sampled for a hexbin plot
+PLOT_MAX_FLIERS = 1_000  # Outlier markers drawn per box
+PLOT_CACHE_INDEX = os.path.join(PLOT_DIR, "plot_cache.json")  # {file name: cache key} of rendered plots
+PLOT_CACHE_VERSION = 1  # Bump when a renderer's output changes
+
+def find_best_columns(df: pd.DataFrame, roles: dict = None):
+    """
+    Identifies the best numeric column (target) and best categorical column (group) dynamically.
+    With `roles` (from analyze_schema) no column is scanned.
+    """
+    if roles is not None:
+        target_col = roles.get("target") if roles.get("target") in df.columns else None
+        group_col = roles.get("category") if roles.get("category") in df.columns else None
+        if not target_col:
+            print("Visualization Error: No suitable numeric column found.")
+            return None, None
+        return target_col, group_col
 
-def find_best_columns(df: pd.DataFrame):
-    """Identifies the best numeric column (target) and best categorical column (group) dynamically."""
-    
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     
     # Prioritize 'charges' or the column with the highest variance if 'charges' is not found
@@ -45,90 +77,498 @@ def find_best_columns(df: pd.DataFrame):
         
     return target_col, group_col
 
-def create_time_series_plot(df: pd.DataFrame, target_col: str) -> str:
+# ======================================================
+# Plot data reduction
+# ======================================================
+# Plots show a few hundred numbers at most, so large frames are reduced
+# before anything reaches matplotlib/seaborn: histograms are pre-binned,
+# box and violin plots are drawn from quantiles and binned densities,
+# scatter plots are sampled (or hex-binned) and correlations come from one
+# matrix product. Render time then no longer grows with the row count.
+def _finite_values(values) -> np.ndarray:
+    values = np.asarray(pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan))
+    return values[np.isfinite(values)]
+
+
+def sample_positions(n_rows: int, max_rows: int, seed: int = 0) -> np.ndarray:
+    """Sorted uniform sample of at most max_rows row positions out of n_rows."""
+    if n_rows <= max_rows:
+        return np.arange(n_rows)
+    return np.sort(np.random.default_rng(seed).choice(n_rows, max_rows, replace=False))
+
+
+def histogram_data(values, bins: int = 30) -> tuple[np.ndarray, np.ndarray]:
+    """(counts, bin edges) of the finite values."""
+    return np.histogram(_finite_values(values), bins=bins)
+
+
+def draw_histogram(ax, counts: np.ndarray, edges: np.ndarray, color=None, kde: bool = True):
+    """Draws pre-binned counts as a seaborn histogram (the KDE is fitted to the bin weights)."""
+    import seaborn as sns
+
+    bins = pd.DataFrame({"value": (edges[:-1] + edges[1:]) / 2, "count": counts})
+    sns.histplot(data=bins, x="value", weights="count", bins=len(counts), binrange=(edges[0], edges[-1]),
+                 kde=bool(kde and np.count_nonzero(counts) > 1), ax=ax, color=color)
+    ax.set_xlabel("")
+
+
+def box_stats(values, label: str = "") -> dict:
+    """Tukey box-plot statistics (1.5 IQR whiskers) for Axes.bxp, with at most PLOT_MAX_FLIERS fliers."""
+    values = _finite_values(values)
+    if not len(values):
+        return {"label": label, "med": np.nan, "q1": np.nan, "q3": np.nan,
+                "whislo": np.nan, "whishi": np.nan, "fliers": np.empty(0)}
+    q1, med, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = (values >= low) & (values <= high)
+    fliers = values[~inside]
+    fliers = fliers[sample_positions(len(fliers), PLOT_MAX_FLIERS)]
+    return {"label": label, "med": med, "q1": q1, "q3": q3,
+            "whislo": values[inside].min(), "whishi": values[inside].max(), "fliers": fliers}
+
+
+def grouped_box_stats(df: pd.DataFrame, group_col: str, value_col: str) -> list:
+    """box_stats for value_col within each group of group_col, in group order."""
+    return [box_stats(group[value_col], label=str(name))
+            for name, group in df[[group_col, value_col]].groupby(group_col, observed=True, sort=True)]
+
+
+def draw_boxes(ax, stats: list, orientation: str = "vertical", colors=None):
+    boxes = ax.bxp(stats, orientation=orientation, patch_artist=True,
+                   flierprops={"marker": "o", "markersize": 3, "alpha": 0.5})
+    for patch, color in zip(boxes["boxes"], colors or []):
+        patch.set_facecolor(color)
+    return boxes
+
+
+def violin_stats(values, points: int = 100) -> dict:
     """
-    Generates a simple time series plot of the target column if a date column exists.
-    For this generic pipeline, we'll skip if no obvious date column exists.
+    Violin statistics for Axes.violin. The density is a finely binned
+    histogram of all values, smoothed with a small Gaussian kernel.
     """
-    print(f"--- [TOOL:Viz] Creating Time Series Plot for {target_col} (Skipping for insurance.csv)---")
-    
-    # Since insurance.csv has no date column, we'll skip time series analysis.
-    # In a real pipeline, we would look for a date column and aggregate daily data.
-    return "N/A: Data is cross-sectional (no date/time column)."
+    values = _finite_values(values)
+    counts, edges = np.histogram(values, bins=points)
+    kernel = np.exp(-0.5 * np.linspace(-2, 2, 9) ** 2)
+    density = np.convolve(counts, kernel / kernel.sum(), mode="same")
+    return {"coords": (edges[:-1] + edges[1:]) / 2, "vals": density,
+            "mean": values.mean(), "median": np.median(values),
+            "min": values.min(), "max": values.max()}
 
 
-def create_categorical_comparison_plot(df: pd.DataFrame, target_col: str, group_col: str) -> str:
+def draw_scatter(ax, x, y, color=None, alpha: float = 0.6):
     """
-    Generates a bar plot comparing the mean of the target_col across categories in group_col.
+    Scatter plot of x against y. Above PLOT_MAX_SCATTER_POINTS rows it becomes
+    a hexbin density plot of a PLOT_MAX_HEXBIN_POINTS-row sample.
+    """
+    x = pd.Series(x).to_numpy(dtype=np.float64, na_value=np.nan)
+    y = pd.Series(y).to_numpy(dtype=np.float64, na_value=np.nan)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if len(x) <= PLOT_MAX_SCATTER_POINTS:
+        ax.scatter(x, y, color=color, alpha=alpha, s=15)
+        return
+    sample = sample_positions(len(x), PLOT_MAX_HEXBIN_POINTS)
+    hexes = ax.hexbin(x[sample], y[sample], gridsize=60, bins="log", mincnt=1, cmap="Blues")
+    ax.figure.colorbar(hexes, ax=ax, label="Count (log)")
+
+
+def correlation_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pearson correlations of the numeric columns (pairwise-complete, like
+    DataFrame.corr) from matrix products of the centred data.
+    """
+    numeric_df = df.select_dtypes(include=[np.number])
+    X = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(X)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Centring keeps the sums of products well conditioned
+        X = X - np.nanmean(X, axis=0) if len(X) else X
+        X[~present] = 0
+        if present.all():
+            cov = X.T @ X
+            var = np.diag(cov)
+            corr = cov / np.sqrt(np.outer(var, var))
+        else:
+            # Sums over the rows where both columns are present
+            mask = present.astype(np.float64)
+            n = mask.T @ mask
+            sums = X.T @ mask
+            sq_sums = (X * X).T @ mask
+            cov = X.T @ X - sums * sums.T / n
+            var = sq_sums - sums ** 2 / n
+            corr = cov / np.sqrt(var * var.T)
+            var = np.diag(var)
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(var > 0, 1.0, np.nan))
+    return pd.DataFrame(corr, index=numeric_df.columns, columns=numeric_df.columns)
+
+
+# ======================================================
+# Plot jobs
+# ======================================================
+# Each plot is split into a job builder, which reduces the DataFrame to the
+# few numbers the figure shows, and a renderer, which draws them on its own
+# matplotlib Figure with the Agg canvas (no pyplot global state). A job is
+# (renderer, kwargs, cache key) or a finished result string: an "N/A: ..."
+# message or the path of a cached plot. render_plots runs independent jobs
+# across a process pool.
+#
+# Plots are cached in PLOT_DIR: the key hashes the columns a plot reads,
+# the renderer and its parameters, and PLOT_CACHE_INDEX records the key each
+# file was rendered with. prune_plot_cache removes only files recorded there.
+# Updates to the index hold a lock (a thread lock plus an flock on a lock file,
+# so concurrent pipeline runs do not drop each other's entries) and replace the
+# file atomically, so readers never see a partly written index.
+_plot_index_lock = threading.Lock()
+
+
+@contextmanager
+def _locked_plot_index():
+    """Yields the plot cache index under lock and saves it on exit."""
+    os.makedirs(PLOT_DIR, exist_ok=True)
+    with _plot_index_lock, open(f"{PLOT_CACHE_INDEX}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        index = _load_plot_index()
+        yield index
+        _save_plot_index(index)
+
+
+def _load_plot_index() -> dict:
+    try:
+        with open(PLOT_CACHE_INDEX, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_plot_index(index: dict):
+    os.makedirs(PLOT_DIR, exist_ok=True)
+    tmp_path = f"{PLOT_CACHE_INDEX}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, PLOT_CACHE_INDEX)
+
+
+def plot_cache_key(df: pd.DataFrame, columns: list, render_fn, params: dict) -> str:
+    """Cache key of a plot: the values of the columns it reads, its renderer and parameters."""
+    key = hashlib.blake2b(digest_size=16)
+    key.update(json.dumps([PLOT_CACHE_VERSION, render_fn.__name__, list(columns), params],
+                          sort_keys=True, default=str).encode("utf-8"))
+    for col in columns:
+        key.update(pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes())
+    return key.hexdigest()
+
+
+def _cached_plot(output_path: str, cache_key: str):
+    """output_path if it was rendered with cache_key and still exists, else None."""
+    if _load_plot_index().get(os.path.basename(output_path)) == cache_key and os.path.exists(output_path):
+        print(f"--- [TOOL:Viz] Reusing cached plot {output_path} ---")
+        return output_path
+    return None
+
+
+def prune_plot_cache(keep_paths) -> list:
+    """
+    Deletes cached plots that are not in keep_paths. Only files recorded in
+    PLOT_CACHE_INDEX are touched. Returns the deleted paths.
+    """
+    keep = {os.path.basename(path) for path in keep_paths if isinstance(path, str)}
+    removed = []
+    with _locked_plot_index() as index:
+        for file_name in [name for name in index if name not in keep]:
+            path = os.path.join(PLOT_DIR, file_name)
+            if os.path.exists(path):
+                os.remove(path)
+                removed.append(path)
+            del index[file_name]
+    return removed
+
+
+def _new_figure(figsize: tuple):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _rotate_xticklabels(ax):
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+
+
+def time_series_job(df: pd.DataFrame, target_col: str, date_col: str = None, use_cache: bool = True):
+    """
+    Job for a daily time series plot of the target column. Data without a
+    date column is cross-sectional and gets no time series plot.
+    """
+    if not date_col or date_col not in df.columns:
+        print(f"--- [TOOL:Viz] Skipping Time Series Plot for {target_col} (no date column) ---")
+        return "N/A: Data is cross-sectional (no date/time column)."
+
+    print(f"--- [TOOL:Viz] Creating Time Series Plot for {target_col} ---")
+    try:
+        output_path = os.path.join(PLOT_DIR, f"daily_{target_col}.png")
+        cache_key = plot_cache_key(df, [date_col, target_col], _render_time_series, {"target_col": target_col})
+        if use_cache and _cached_plot(output_path, cache_key):
+            return output_path
+
+        from tools.ml_tools import _to_datetime
+
+        dates = _to_datetime(df[date_col])
+        daily = df[target_col].groupby(dates.dt.floor('D')).sum().sort_index()
+        if daily.empty:
+            return "N/A: No dated rows to plot."
+        return _render_time_series, {
+            "daily": daily, "target_col": target_col, "output_path": output_path,
+        }, cache_key
+    except Exception as e:
+        return f"N/A: Error creating time series plot: {e}"
+
+
+def _render_time_series(daily: pd.Series, target_col: str, output_path: str) -> str:
+    try:
+        fig = _new_figure((12, 5))
+        ax = fig.add_subplot()
+        ax.plot(daily.index, daily.to_numpy(), color="steelblue")
+
+        ax.set_title(f'Daily Total {target_col.title()}')
+        ax.set_xlabel('Date')
+        ax.set_ylabel(f'Total {target_col.title()}')
+        _rotate_xticklabels(ax)
+        fig.tight_layout()
+        fig.savefig(output_path)
+        return output_path
+
+    except Exception as e:
+        return f"N/A: Error creating time series plot: {e}"
+
+
+def categorical_comparison_job(df: pd.DataFrame, target_col: str, group_col: str, use_cache: bool = True):
+    """
+    Job for a bar plot comparing the mean of the target_col across categories in group_col.
     """
     if not target_col or not group_col:
         return "N/A: Missing suitable target or group column for categorical plot."
         
     print(f"--- [TOOL:Viz] Creating Categorical Comparison Plot: {target_col} by {group_col} ---")
-    
     try:
+        output_path = os.path.join(PLOT_DIR, f"avg_{target_col}_by_{group_col}.png")
+        cache_key = plot_cache_key(df, [group_col, target_col], _render_categorical_comparison,
+                                   {"target_col": target_col, "group_col": group_col})
+        if use_cache and _cached_plot(output_path, cache_key):
+            return output_path
+
         # Calculate mean target (charges) per group (e.g., region)
-        plot_data = df.groupby(group_col)[target_col].mean().sort_values(ascending=False).reset_index()
+        plot_data = df.groupby(group_col, observed=True)[target_col].mean().sort_values(ascending=False).reset_index()
+        return _render_categorical_comparison, {
+            "plot_data": plot_data, "target_col": target_col, "group_col": group_col,
+            "output_path": output_path,
+        }, cache_key
+    except Exception as e:
+        return f"N/A: Error creating categorical plot: {e}"
+
+
+def _render_categorical_comparison(plot_data: pd.DataFrame, target_col: str, group_col: str,
+                                   output_path: str) -> str:
+    try:
+        import seaborn as sns
 
-        plt.figure(figsize=(10, 6))
+        fig = _new_figure((10, 6))
+        ax = fig.add_subplot()
         sns.barplot(
             x=group_col, 
             y=target_col, 
             data=plot_data, 
-            palette="viridis"
+            palette="viridis",
+            ax=ax
         )
         
         # Formatting
-        plt.title(f'Average {target_col.title()} by {group_col.title()}')
-        plt.xlabel(group_col.title())
-        plt.ylabel(f'Average {target_col.title()}')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
+        ax.set_title(f'Average {target_col.title()} by {group_col.title()}')
+        ax.set_xlabel(group_col.title())
+        ax.set_ylabel(f'Average {target_col.title()}')
+        _rotate_xticklabels(ax)
+        fig.tight_layout()
 
         # Save the plot
-        file_name = f"avg_{target_col}_by_{group_col}.png"
-        output_path = os.path.join(PLOT_DIR, file_name)
-        plt.savefig(output_path)
-        plt.close()
-
+        fig.savefig(output_path)
         return output_path
         
     except Exception as e:
         return f"N/A: Error creating categorical plot: {e}"
 
 
-def create_correlation_heatmap(df: pd.DataFrame) -> str:
+def correlation_heatmap_job(df: pd.DataFrame, use_cache: bool = True):
     """
-    Generates a heatmap of numeric column correlations.
+    Job for a heatmap of numeric column correlations.
     """
     print("--- [TOOL:Viz] Creating Correlation Heatmap ---")
-    
     try:
         numeric_df = df.select_dtypes(include=[np.number])
         if numeric_df.shape[1] < 2:
             return "N/A: Not enough numeric columns (less than 2) for correlation analysis."
-            
-        corr_matrix = numeric_df.corr()
 
-        plt.figure(figsize=(10, 8))
+        output_path = os.path.join(PLOT_DIR, "correlation_heatmap.png")
+        cache_key = plot_cache_key(numeric_df, list(numeric_df.columns), _render_correlation_heatmap, {})
+        if use_cache and _cached_plot(output_path, cache_key):
+            return output_path
+
+        return _render_correlation_heatmap, {
+            "corr_matrix": correlation_matrix(numeric_df),
+            "output_path": output_path,
+        }, cache_key
+    except Exception as e:
+        return f"N/A: Error creating heatmap: {e}"
+
+
+def _render_correlation_heatmap(corr_matrix: pd.DataFrame, output_path: str) -> str:
+    try:
+        import seaborn as sns
+
+        fig = _new_figure((10, 8))
+        ax = fig.add_subplot()
         sns.heatmap(
             corr_matrix, 
             annot=True, 
             cmap='coolwarm', 
             fmt=".2f", 
             linewidths=.5, 
-            linecolor='black'
+            linecolor='black',
+            ax=ax
         )
         
-        plt.title('Numeric Feature Correlation Heatmap')
-        plt.tight_layout()
+        ax.set_title('Numeric Feature Correlation Heatmap')
+        fig.tight_layout()
 
         # Save the plot
-        output_path = os.path.join(PLOT_DIR, "correlation_heatmap.png")
-        plt.savefig(output_path)
-        plt.close()
-
+        fig.savefig(output_path)
         return output_path
         
     except Exception as e:
-        return f"N/A: Error creating heatmap: {e}"
\ No newline at end of file
+        return f"N/A: Error creating heatmap: {e}"
+
+
+def _timed_render(render_fn, kwargs: dict) -> tuple:
+    start = time.perf_counter()
+    result = render_fn(**kwargs)
+    return result, time.perf_counter() - start
+
+
+# Long-lived render workers. Spawning a worker and importing matplotlib and
+# seaborn in it takes about a second, several times the cost of a typical
+# plot, so the pool is started (and warmed up) once per pipeline rather than
+# per render_plots call. Without a started pool plots render in-process.
+_plot_pool = None
+
+
+def _warm_up_worker():
+    import seaborn  # noqa: F401  (also imports matplotlib)
+
+    # Drawing text once loads the font cache
+    fig = _new_figure((1, 1))
+    fig.text(0.5, 0.5, "warm-up")
+    fig.canvas.draw()
+
+
+def start_plot_pool(max_workers: int = None) -> bool:
+    """
+    Starts the shared render pool and warms up its workers in the background.
+    Does nothing with a single CPU (no parallelism to gain) or inside a worker
+    process (no nested pools). Returns True if a pool is running.
+
+    Callers start it only for datasets of PLOT_POOL_MIN_ROWS rows or more:
+    below that the frames are built quickly enough that the workers would
+    still be importing when the plots are ready to render.
+    """
+    global _plot_pool
+    if _plot_pool is not None:
+        return True
+    max_workers = min(max_workers or PLOT_POOL_WORKERS, os.cpu_count() or 1)
+    if max_workers < 2 or multiprocessing.parent_process() is not None:
+        return False
+
+    _plot_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_warm_up_worker)
+    # One task per worker makes the pool start all of them now, not on first use
+    for _ in range(max_workers):
+        _plot_pool.submit(int)
+    return True
+
+
+def shutdown_plot_pool(wait: bool = True):
+    """Stops the render pool; with wait=False workers still warming up are not waited for."""
+    global _plot_pool
+    if _plot_pool is not None:
+        _plot_pool.shutdown(wait=wait, cancel_futures=True)
+        _plot_pool = None
+
+
+def render_plots(jobs: dict) -> tuple[dict, dict]:
+    """
+    Renders plot jobs ({name: job}) and returns ({name: path or "N/A: ..."},
+    {name: render seconds}). From PLOT_MIN_PARALLEL_JOBS jobs on they are
+    rendered in the shared pool (see start_plot_pool) when it is running, so
+    wall time is set by the slowest plot rather than the sum of all of them;
+    dispatching a job to a warm worker costs a few milliseconds. Rendered
+    plots are recorded in the plot cache index.
+    """
+    results, timings = {}, {}
+    runnable = {}
+    for name, job in jobs.items():
+        if isinstance(job, str):
+            results[name] = job
+        else:
+            runnable[name] = job
+
+    pool = _plot_pool
+    if pool is None or len(runnable) < PLOT_MIN_PARALLEL_JOBS:
+        for name, (render_fn, kwargs, _) in runnable.items():
+            results[name], timings[name] = _timed_render(render_fn, kwargs)
+    else:
+        futures = {pool.submit(_timed_render, render_fn, kwargs): name
+                   for name, (render_fn, kwargs, _) in runnable.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name], timings[name] = future.result()
+            except Exception as e:
+                # e.g. the worker process died: only this plot fails
+                results[name] = f"N/A: Error rendering plot: {e}"
+
+    for name, seconds in timings.items():
+        print(f"--- [TOOL:Viz] Rendered {name} in {seconds:.2f}s ---")
+
+    rendered = {name: job for name, job in runnable.items() if results[name] == job[1]["output_path"]}
+    if rendered:
+        with _locked_plot_index() as index:
+            for render_fn, kwargs, cache_key in rendered.values():
+                index[os.path.basename(kwargs["output_path"])] = cache_key
+    # Keep the callers' plot order
+    return {name: results[name] for name in jobs}, timings
+
+
+def create_time_series_plot(df: pd.DataFrame, target_col: str, date_col: str = None) -> str:
+    """
+    Generates a daily time series plot of the target column if a date column exists.
+    """
+    return render_plots({"time_series": time_series_job(df, target_col, date_col)})[0]["time_series"]
+
+
+def create_categorical_comparison_plot(df: pd.DataFrame, target_col: str, group_col: str) -> str:
+    """
+    Generates a bar plot comparing the mean of the target_col across categories in group_col.
+    """
+    job = categorical_comparison_job(df, target_col, group_col)
+    return render_plots({"categorical_comparison": job})[0]["categorical_comparison"]
+
+
+def create_correlation_heatmap(df: pd.DataFrame) -> str:
+    """
+    Generates a heatmap of numeric column correlations.
+    """
+    return render_plots({"correlation_heatmap": correlation_heatmap_job(df)})[0]["correlation_heatmap"]